@@ -0,0 +1,414 @@
+"""Offline benchmark suite for the Algorithmic Auditor backend.
+
+Times each pipeline stage in process (ingest, encoding, sampling/split,
+training, metrics) on synthetic CSVs of several sizes and widths, then drives
+the real endpoints on a locally launched uvicorn under concurrent load. Cold
+start (import time and time-to-ready per STARTUP_MODE) is measured as well.
+
+    python backend/benchmark.py --sizes 10000,100000 --output bench.json
+    python backend/benchmark.py --output new.json --compare bench.json
+
+Comparison mode exits with status 1 when any timing regressed by more than
+--threshold (relative p50) against the stored baseline, or any stage's memory
+growth (its peak RSS above where it started) by more than the same share.
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import platform
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+import main  # noqa: E402  (the backend module under test)
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def peak_rss_mb(pid=None):
+    # Peak RSS of this process, or of another one via /proc (Linux only)
+    if pid is not None:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            return None
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def reset_peak_rss():
+    # Linux: writing 5 to clear_refs resets this process's VmHWM (and
+    # ru_maxrss) to the current RSS, so the next read is a stage's own peak
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def summarize(latencies, rows=None, wall_s=None):
+    latencies = np.asarray(latencies)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    summary = {
+        "n": len(latencies),
+        "p50_s": round(float(p50), 5),
+        "p95_s": round(float(p95), 5),
+        "p99_s": round(float(p99), 5),
+        "mean_s": round(float(latencies.mean()), 5),
+    }
+    if wall_s:
+        summary["throughput_rps"] = round(len(latencies) / wall_s, 2)
+    if rows:
+        summary["rows_per_s"] = round(rows / float(p50), 1)
+    return summary
+
+def timed(fn, repeat):
+    latencies, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies, result
+
+def write_synthetic_csv(path, rows, width, seed=0, chunk_rows=250_000):
+    # Chunked so even multi-million-row files are written in bounded memory.
+    # Half the feature columns are numeric, half categorical (one high-cardinality).
+    rng = np.random.default_rng(seed)
+    n_numeric = max(1, width // 2)
+    n_text = max(1, width - n_numeric)
+    first = True
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        sex = rng.choice(["Male", "Female"], n)
+        frame = {"gender": sex}
+        for i in range(n_numeric):
+            frame[f"num_{i}"] = rng.normal(0, 1, n).round(4)
+        for i in range(n_text):
+            cardinality = 5000 if i == 0 else 8
+            frame[f"cat_{i}"] = np.char.add("c", rng.integers(0, cardinality, n).astype(str))
+        frame["approved"] = ((frame["num_0"] + (sex == "Male") * 0.5 + rng.normal(0, 1, n)) > 0.5).astype(int)
+        pd.DataFrame(frame).to_csv(path, mode="w" if first else "a", header=first, index=False)
+        first = False
+    return path
+
+# ============================================================================
+# IN-PROCESS STAGES
+# ============================================================================
+
+def bench_stages(rows, width, path, repeat, train_rows):
+    results = {}
+
+    def stage(name, fn, repeat, stage_rows=None):
+        # Timings plus the stage's own memory: its peak RSS, and how far that
+        # peak rose above the RSS the stage started from
+        start, reset = main.current_rss(), reset_peak_rss()
+        latencies, result = timed(fn, repeat)
+        peak = peak_rss_mb(os.getpid()) if reset else None
+        if peak is None:
+            # No resettable high-water mark: the end of the stage is all we see
+            end = main.current_rss()
+            peak = None if end is None else round(max(start, end) / 2**20, 1)
+        growth = None if peak is None or start is None else round(max(peak - start / 2**20, 0.0), 1)
+        results[name] = {**summarize(latencies, rows=stage_rows), "peak_rss_mb": peak, "rss_growth_mb": growth}
+        return result
+
+    stage("generate_synthetic_data", lambda: main.generate_synthetic_data(min(rows, train_rows), seed=0), repeat, min(rows, train_rows))
+
+    def ingest():
+        with open(path, "rb") as f:
+            return main.ingest_csv(f)[0]
+    dataset = stage("ingest", ingest, repeat, rows)
+
+    sample = np.sort(np.random.default_rng(0).choice(len(dataset), min(len(dataset), train_rows), replace=False))
+    stage("design_matrix", lambda: dataset.design_matrix(sample), repeat, len(sample))
+
+    X, y, sex = dataset.design_matrix(sample), dataset.target(sample), dataset.sensitive(sample)
+    split = stage("split", lambda: main.split_data(X, y, sex, seed=0), repeat, len(sample))
+
+    stage("fit_biased", lambda: main.fit_biased(split, seed=0), repeat, len(sample))
+
+    stage("fit_mitigated", lambda: main.fit_mitigated(split, seed=0), max(1, repeat // 2), len(sample))
+
+    # Metrics engine on a full-size prediction vector
+    rng = np.random.default_rng(0)
+    y_true, y_pred = rng.integers(0, 2, rows), rng.integers(0, 2, rows)
+    groups = dataset.sensitive(np.arange(rows) % len(dataset))
+    stage("group_metrics", lambda: main.group_metrics(y_true, y_pred, groups), repeat, rows)
+
+    return results
+
+# ============================================================================
+# ENDPOINTS ON A LOCAL UVICORN
+# ============================================================================
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+STATE_DIRS = ("RESULT_CACHE_DIR", "ARTIFACT_DIR", "DATASET_SPILL_DIR", "UPLOAD_DIR")
+
+def start_server(port, env=None, probe="/"):
+    # Returns once `probe` answers 200 (readiness probes answer 503 before).
+    # Every server gets fresh cache/artifact/spill dirs: fixed seeds would
+    # otherwise hit a previous run's disk cache instead of fitting.
+    state_dir = tempfile.mkdtemp(prefix="auditor-bench-")
+    state_env = {name: os.path.join(state_dir, name.lower()) for name in STATE_DIRS}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **state_env, **(env or {})},
+        start_new_session=True,  # own process group, so pool workers go down with it
+    )
+    server.state_dir = state_dir
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}{probe}", timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    stop_server(server)
+    raise RuntimeError("uvicorn did not come up within 60s")
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        pass
+    try:
+        os.killpg(server.pid, signal.SIGKILL)
+    except (OSError, AttributeError):  # group already gone / not POSIX
+        pass
+    shutil.rmtree(server.state_dir, ignore_errors=True)
+
+def post_json(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=600) as response:
+        return json.loads(response.read())
+
+def post_file(url, path):
+    # Minimal multipart/form-data body, stdlib only
+    boundary = uuid.uuid4().hex
+    with open(path, "rb") as f:
+        content = f.read()
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"data.csv\"\r\n"
+        f"Content-Type: text/csv\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    with urllib.request.urlopen(request, timeout=3600) as response:
+        return json.loads(response.read())
+
+def load_test(url, payloads, concurrency, expect_cache=None):
+    # expect_cache: every response's "cache" must be this (e.g. "miss" for
+    # cold fits), or the timings aren't measuring what they claim to
+    latencies, caches, errors = [], [], 0
+
+    def call(payload):
+        started = time.perf_counter()
+        response = post_json(url, payload)
+        return time.perf_counter() - started, response.get("cache")
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in concurrent.futures.as_completed([pool.submit(call, p) for p in payloads]):
+            try:
+                latency, cache = future.result()
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(latency)
+            caches.append(cache)
+    wall_s = time.perf_counter() - started
+    unexpected = [cache for cache in caches if expect_cache is not None and cache != expect_cache]
+    assert not unexpected, f"{url}: expected cache={expect_cache!r}, got {unexpected}"
+    return {**summarize(latencies or [float("nan")], wall_s=wall_s), "errors": errors}
+
+def bench_startup(repeat, with_server=True):
+    # Cold-start cost per STARTUP_MODE: a fresh interpreter importing the
+    # backend, and (with a server) time until / answers or /readyz says ready
+    results = {}
+    for mode in ("lazy", "eager"):
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, "-c", "import main"], cwd=BACKEND_DIR, env={**os.environ, "STARTUP_MODE": mode}, check=True)
+            latencies.append(time.perf_counter() - started)
+        results[f"import_{mode}"] = summarize(latencies)
+    if not with_server:
+        return results
+
+    for mode, probe in (("lazy", "/"), ("prewarm", "/readyz")):
+        latencies, first_fit = [], []
+        for _ in range(repeat):
+            port = free_port()
+            started = time.perf_counter()
+            server = start_server(port, {"STARTUP_MODE": mode}, probe)
+            latencies.append(time.perf_counter() - started)
+            try:
+                # First real request: pays any import/warm-up not done at startup
+                started = time.perf_counter()
+                post_json(f"http://127.0.0.1:{port}/train/mitigated", {"n_samples": 500, "seed": int(time.time_ns() % 1_000_000)})
+                first_fit.append(time.perf_counter() - started)
+            finally:
+                stop_server(server)
+        results[f"ready_{mode}"] = summarize(latencies)
+        results[f"first_mitigated_{mode}"] = summarize(first_fit)
+    return results
+
+def bench_endpoints(path, requests_per_endpoint, concurrency, train_rows):
+    port = free_port()
+    server = start_server(port)
+    base = f"http://127.0.0.1:{port}"
+    results = {}
+    try:
+        started = time.perf_counter()
+        upload = post_file(f"{base}/upload", path)
+        results["upload"] = {**summarize([time.perf_counter() - started]), "rows": upload.get("rows")}
+        dataset_id = upload["dataset_id"]
+
+        # Distinct seeds (and a fresh cache dir) so every request misses the
+        # result cache and does real work
+        def payloads(n):
+            return [{"n_samples": train_rows, "dataset_id": dataset_id, "seed": 1000 + i} for i in range(n)]
+
+        results["train_biased"] = load_test(f"{base}/train/biased", payloads(requests_per_endpoint), concurrency, expect_cache="miss")
+        heavy = max(2, requests_per_endpoint // 5)
+        results["train_mitigated"] = load_test(f"{base}/train/mitigated", payloads(heavy), concurrency, expect_cache="miss")
+        results["audit"] = load_test(f"{base}/audit", payloads(heavy), concurrency, expect_cache="miss")
+
+        # Same payload repeatedly: cache-hit latency
+        results["train_biased_cached"] = load_test(f"{base}/train/biased", payloads(1) * requests_per_endpoint, concurrency)
+        results["server_peak_rss_mb"] = peak_rss_mb(server.pid)
+    finally:
+        stop_server(server)
+    return results
+
+# ============================================================================
+# COMPARISON
+# ============================================================================
+
+def flatten(results, prefix=""):
+    # {"a": {"b": {"p50_s": ..}}} -> {"a/b": {"p50_s": ..}}
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict) and "p50_s" in value:
+            flat[f"{prefix}{key}"] = value
+        elif isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}/"))
+    return flat
+
+RSS_COMPARE_MIN_MB = 8
+
+def compare(current, baseline, threshold):
+    current, baseline = flatten(current["results"]), flatten(baseline["results"])
+    report = []
+    for key in sorted(set(current) & set(baseline)):
+        old, new = baseline[key]["p50_s"], current[key]["p50_s"]
+        if not old or np.isnan(old) or np.isnan(new):
+            continue
+        change = (new - old) / old
+        report.append({"benchmark": key, "baseline_p50_s": old, "p50_s": new, "change": round(change, 3), "regressed": change > threshold})
+        # Stage memory: growth above the stage's starting RSS, ignoring
+        # stages too small for the change to be more than noise
+        old_mb, new_mb = baseline[key].get("rss_growth_mb"), current[key].get("rss_growth_mb")
+        if old_mb is not None and new_mb is not None and old_mb >= RSS_COMPARE_MIN_MB:
+            change = (new_mb - old_mb) / old_mb
+            report.append({"benchmark": f"{key} rss", "baseline_rss_growth_mb": old_mb, "rss_growth_mb": new_mb, "change": round(change, 3), "regressed": change > threshold})
+    return report
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated row counts, e.g. 10000,1000000,5000000")
+    parser.add_argument("--widths", default="8,32", help="comma-separated feature column counts")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions per in-process stage")
+    parser.add_argument("--train-rows", type=int, default=5000, help="n_samples used for training stages and requests")
+    parser.add_argument("--requests", type=int, default=20, help="requests per endpoint in the load test")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent clients in the load test")
+    parser.add_argument("--no-server", action="store_true", help="skip the uvicorn endpoint benchmarks")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative p50 slowdown counted as a regression")
+    return parser.parse_args()
+
+def main_cli():
+    args = parse_args()
+    sizes = [int(v) for v in args.sizes.split(",")]
+    widths = [int(v) for v in args.widths.split(",")]
+
+    output = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": {},
+    }
+
+    print("[bench] cold start", flush=True)
+    output["results"]["startup"] = bench_startup(args.repeat, with_server=not args.no_server)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in sizes:
+            for width in widths:
+                label = f"rows={rows}/width={width}"
+                print(f"[bench] {label}: writing CSV", flush=True)
+                path = write_synthetic_csv(os.path.join(workdir, f"{rows}_{width}.csv"), rows, width)
+
+                print(f"[bench] {label}: in-process stages", flush=True)
+                output["results"].setdefault("stages", {})[label] = bench_stages(rows, width, path, args.repeat, args.train_rows)
+
+                if not args.no_server:
+                    print(f"[bench] {label}: endpoints", flush=True)
+                    output["results"].setdefault("endpoints", {})[label] = bench_endpoints(path, args.requests, args.concurrency, args.train_rows)
+                os.remove(path)
+
+    # Stages reset the high-water mark, so the run's peak is the largest seen
+    peaks = [peak_rss_mb(), *(entry.get("peak_rss_mb") for entry in flatten(output["results"]).values())]
+    output["meta"]["peak_rss_mb"] = max((peak for peak in peaks if peak is not None), default=None)
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"[bench] wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report = compare(output, baseline, args.threshold)
+        for line in report:
+            flag = "REGRESSED" if line["regressed"] else "ok"
+            print(f"{flag:>9}  {line['change']:+7.1%}  {line['benchmark']}")
+        if any(line["regressed"] for line in report):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,17 +1,107 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+import time
+_module_started = time.perf_counter()
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import pandas as pd
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from multiprocessing import shared_memory
+import asyncio
 import numpy as np
+import gzip
+import hashlib
+import importlib
+import importlib.util
 import io
-from sklearn.model_selection import train_test_split
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.metrics import accuracy_score
-from sklearn.preprocessing import LabelEncoder
-from fairlearn.metrics import MetricFrame, selection_rate, demographic_parity_difference
-from fairlearn.reductions import ExponentiatedGradient, DemographicParity
+import json
+import itertools
+import logging
+import multiprocessing
+import os
+import re
+import stat
+import tempfile
+import threading
+import uuid
+import warnings
+import zlib
 
-app = FastAPI()
+# --- LAZY IMPORTS ---
+# pandas, scipy, sklearn, fairlearn and pyarrow take ~2s to import, so by
+# default they load on first use and the API answers health checks at once.
+# STARTUP_MODE=eager imports them at load; "prewarm" loads them (and warms
+# the job pool) in the background right after startup.
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "lazy")
+if STARTUP_MODE not in ("lazy", "eager", "prewarm"):
+    raise ValueError(f"STARTUP_MODE must be 'lazy', 'eager' or 'prewarm', got {STARTUP_MODE!r}")
+import_timings = {}  # module -> seconds its first import took in this process
+
+class _LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            started = time.perf_counter()
+            module = importlib.import_module(self._name)
+            import_timings.setdefault(self._name, round(time.perf_counter() - started, 4))
+            self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        module = self._load()
+        try:
+            return getattr(module, attr)
+        except AttributeError:
+            # Submodules such as pyarrow.ipc aren't attributes until imported
+            return importlib.import_module(f"{self._name}.{attr}")
+
+pd = _LazyModule("pandas")
+sparse = _LazyModule("scipy.sparse")
+sklearn_model_selection = _LazyModule("sklearn.model_selection")
+sklearn_tree = _LazyModule("sklearn.tree")
+fairlearn_reductions = _LazyModule("fairlearn.reductions")
+# ExponentiatedGradient internals, driven directly by fast mitigation
+fairlearn_lagrangian = _LazyModule("fairlearn.reductions._exponentiated_gradient._lagrangian")
+fairlearn_eg_constants = _LazyModule("fairlearn.reductions._exponentiated_gradient._constants")
+scipy_optimize = _LazyModule("scipy.optimize")
+LAZY_MODULES = (pd, sparse, sklearn_model_selection, sklearn_tree, fairlearn_reductions)
+
+def import_ml_stack():
+    # Force every lazy module in; returns this process's import timings
+    for module in LAZY_MODULES:
+        module._load()
+    return dict(import_timings)
+
+if STARTUP_MODE == "eager":
+    import_ml_stack()
+
+try:
+    import zstandard
+except ImportError:  # zstd uploads are rejected when the codec isn't installed
+    zstandard = None
+
+# without pyarrow, cold datasets are dropped instead of spilled
+pa = _LazyModule("pyarrow") if importlib.util.find_spec("pyarrow") else None
+
+@asynccontextmanager
+async def lifespan(app):
+    warm = asyncio.create_task(prewarm()) if STARTUP_MODE == "prewarm" else None
+    yield
+    if warm is not None:
+        warm.cancel()
+    # Stop pool workers and the progress Manager with the server, not after it
+    jobs.shutdown()
+    registry.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,159 +109,3493 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Injected-Parity-Gap", "X-Injected-Impact-Ratio"],
 )
 
-# --- GLOBAL STORAGE ---
-# In a real app, use a database. For this demo, global variables are fine.
-data_store = {
-    "X": None,
-    "y": None,
-    "sensitive": None,
-    "is_uploaded": False
-}
+# --- STAGE INSTRUMENTATION ---
+# Every hot-path stage (decode, dropna, encode, sample, split, fit, metrics)
+# feeds a fixed-bucket histogram and an RSS delta. Recording is a couple of
+# perf_counter calls and one pread, cheap enough to leave on in production.
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_request_timings = ContextVar("request_timings", default=None)
+_statm = {"pid": None, "fd": None}
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def current_rss():
+    # Resident bytes from /proc/self/statm; the fd is reopened after a fork
+    if _statm["pid"] != os.getpid():
+        try:
+            _statm["fd"] = os.open("/proc/self/statm", os.O_RDONLY)
+        except OSError:  # no procfs (macOS, Windows): skip memory deltas
+            _statm["fd"] = None
+        _statm["pid"] = os.getpid()
+    if _statm["fd"] is None:
+        return None
+    return int(os.pread(_statm["fd"], 128, 0).split()[1]) * _PAGE_SIZE
+
+class StageMetrics:
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._requests = {}
+
+    @staticmethod
+    def _new_histogram(size):
+        return {"counts": [0] * size, "count": 0, "sum": 0.0}
+
+    def _observe(self, histogram, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                histogram["counts"][i] += 1
+                break
+        histogram["count"] += 1
+        histogram["sum"] += seconds
+
+    def observe(self, name, seconds, rss_delta=None):
+        with self._lock:
+            entry = self._stages.get(name)
+            if entry is None:
+                entry = self._stages[name] = {**self._new_histogram(len(self.buckets)), "rss_growth_sum": 0, "rss_shrink_sum": 0, "rss_delta_max": 0, "rss_seen": False}
+            self._observe(entry, seconds)
+            if rss_delta is not None:
+                # Kept as two non-negative sums, so both can be Prometheus counters
+                entry["rss_growth_sum"] += max(rss_delta, 0)
+                entry["rss_shrink_sum"] += max(-rss_delta, 0)
+                entry["rss_delta_max"] = max(entry["rss_delta_max"], rss_delta) if entry["rss_seen"] else rss_delta
+                entry["rss_seen"] = True
+
+    def observe_request(self, method, path, status, seconds):
+        with self._lock:
+            key = (method, path, str(status))
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = self._new_histogram(len(self.buckets))
+            self._observe(histogram, seconds)
+
+    def _histogram_lines(self, metric, labels, histogram):
+        cumulative = 0
+        for bound, count in zip(self.buckets, histogram["counts"]):
+            cumulative += count
+            yield f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{metric}_bucket{{{labels},le="+Inf"}} {histogram["count"]}'
+        yield f'{metric}_sum{{{labels}}} {histogram["sum"]:.6f}'
+        yield f'{metric}_count{{{labels}}} {histogram["count"]}'
+
+    def prometheus(self):
+        # Prometheus text exposition format, no client library needed
+        with self._lock:
+            stages = {name: {**entry, "counts": list(entry["counts"])} for name, entry in self._stages.items()}
+            requests = {key: {**entry, "counts": list(entry["counts"])} for key, entry in self._requests.items()}
+        lines = [
+            "# HELP auditor_stage_duration_seconds Time spent in each pipeline stage.",
+            "# TYPE auditor_stage_duration_seconds histogram",
+        ]
+        for name, entry in sorted(stages.items()):
+            lines.extend(self._histogram_lines("auditor_stage_duration_seconds", f'stage="{name}"', entry))
+        for direction, help_text in (("growth", "grew"), ("shrink", "shrank")):
+            lines += [
+                f"# HELP auditor_stage_rss_{direction}_bytes_total Resident memory the stage {help_text} by, summed over runs.",
+                f"# TYPE auditor_stage_rss_{direction}_bytes_total counter",
+            ]
+            lines += [f'auditor_stage_rss_{direction}_bytes_total{{stage="{name}"}} {entry[f"rss_{direction}_sum"]}' for name, entry in sorted(stages.items()) if entry["rss_seen"]]
+        lines += [
+            "# HELP auditor_stage_rss_delta_bytes_max Largest resident memory growth seen in one stage run.",
+            "# TYPE auditor_stage_rss_delta_bytes_max gauge",
+        ]
+        lines += [f'auditor_stage_rss_delta_bytes_max{{stage="{name}"}} {entry["rss_delta_max"]}' for name, entry in sorted(stages.items()) if entry["rss_seen"]]
+        lines += [
+            "# HELP auditor_request_duration_seconds HTTP request latency by route.",
+            "# TYPE auditor_request_duration_seconds histogram",
+        ]
+        for (method, path, status), entry in sorted(requests.items()):
+            lines.extend(self._histogram_lines("auditor_request_duration_seconds", f'method="{method}",path="{path}",status="{status}"', entry))
+        return lines
+
+stage_metrics = StageMetrics()
+
+def server_timing(name, seconds):
+    # Attach a timing to the current request's Server-Timing header (if any)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+def record_stage(name, seconds, rss_delta=None):
+    stage_metrics.observe(name, seconds, rss_delta)
+    server_timing(name, seconds)
+
+class stage:
+    # with stage("split") as timed: ...; timed.seconds afterwards
+    __slots__ = ("name", "seconds", "_started", "_rss")
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self._rss = current_rss()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._started
+        rss = current_rss()
+        record_stage(self.name, self.seconds, None if rss is None or self._rss is None else rss - self._rss)
+        return False
+
+class StageClock:
+    # Sums a stage that runs interleaved with others (per-chunk work), then
+    # records it once so a 500-chunk upload is one observation, not 500
+    def __init__(self, *names):
+        self.seconds = dict.fromkeys(names, 0.0)
+        self.rss = dict.fromkeys(names, 0)
+        self.start_rss = self.peak_rss = current_rss()
+
+    def add(self, name, started, rss_before):
+        self.seconds[name] += time.perf_counter() - started
+        rss = current_rss()
+        if rss is not None and rss_before is not None:
+            self.rss[name] += rss - rss_before
+            self.peak_rss = max(self.peak_rss, rss_before, rss)
+
+    def peak_growth_mb(self):
+        # Highest RSS sampled since the clock started, above where it started
+        if self.start_rss is None:
+            return None
+        return round((self.peak_rss - self.start_rss) / 2**20, 1)
+
+    def record(self):
+        for name, seconds in self.seconds.items():
+            record_stage(name, seconds, self.rss[name])
+
+@app.middleware("http")
+async def server_timing_header(request: Request, call_next):
+    timings = []
+    token = _request_timings.set(timings)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _request_timings.reset(token)
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    stage_metrics.observe_request(request.method, getattr(route, "path", "unmatched"), response.status_code, elapsed)
+    # Durations in ms per the Server-Timing spec; repeated stages are summed
+    totals = {}
+    for name, seconds in timings:
+        totals[name] = totals.get(name, 0.0) + seconds
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in totals.items()]
+    response.headers["Server-Timing"] = ", ".join(entries + [f"total;dur={elapsed * 1000:.2f}"])
+    return response
 
 # --- HELPER: SYNTHETIC DATA (Backup) ---
-def generate_synthetic_data(n=2000):
-    X = pd.DataFrame(np.random.rand(n, 5), columns=['A','B','C','D','E'])
-    bias = np.random.rand(n)
-    sex = np.random.choice([0, 1], n) # 0=Male, 1=Female
-    score = X['A'] + X['B'] + (1 - sex) * 0.3 
-    y = (score > 1.0).astype(int)
-    return X, y, pd.Series(sex).map({0: 'Male', 1: 'Female'})
+# Seeded, vectorized generator with a known injected bias: group g is
+# approved with probability base_rate - bias * g / (groups - 1), so the true
+# demographic parity gap is exactly `bias`. Numeric features carry the label
+# signal (the first one can also leak the group); categorical features are
+# skewed towards low codes. Chunk i draws from default_rng([seed, i]), so
+# any number of rows is produced in bounded memory, reproducibly.
+SYNTHETIC_FEATURES = ['A','B','C','D','E']
+SYNTHETIC_CHUNK_ROWS = int(os.environ.get("SYNTHETIC_CHUNK_ROWS", 500_000))
+SYNTHETIC_MAX_ROWS = int(os.environ.get("SYNTHETIC_MAX_ROWS", 50_000_000))  # per POST /synthetic
+SYNTHETIC_MAX_CARDINALITY = 100_000  # one label string per category is kept in memory
+GZIP_LEVEL = 3  # fast; synthetic CSV compresses well anyway
+
+class SyntheticSpec(BaseModel):
+    rows: int = Field(100_000, ge=1)
+    seed: int = 0
+    groups: int = Field(2, ge=2, le=10_000)
+    group_weights: Optional[List[float]] = None   # relative group sizes, equal if omitted
+    base_rate: float = Field(0.75, gt=0, lt=1)     # approval rate of the first (most favoured) group
+    bias: float = Field(0.25, ge=0, lt=1)          # approval-rate gap between first and last group
+    numeric_features: int = Field(5, ge=0, le=1000)
+    categorical_features: int = Field(0, ge=0, le=1000)
+    cardinality: int = Field(10, ge=1, le=SYNTHETIC_MAX_CARDINALITY)
+    signal: float = Field(1.0, ge=0)               # label separation of the numeric features
+    proxy: float = Field(0.0, ge=0)                # how far the first numeric feature shifts with group
+    chunk_rows: int = Field(SYNTHETIC_CHUNK_ROWS, ge=1)
+
+def synthetic_rates(spec):
+    if spec.base_rate - spec.bias <= 0:
+        raise ValueError("base_rate must be larger than bias, or the last group's approval rate is not positive")
+    if spec.group_weights is not None and (len(spec.group_weights) != spec.groups or min(spec.group_weights) < 0 or sum(spec.group_weights) <= 0):
+        raise ValueError(f"group_weights needs {spec.groups} non-negative weights with a positive sum")
+    return spec.base_rate - spec.bias * np.arange(spec.groups) / (spec.groups - 1)
+
+def synthetic_labels(spec):
+    # Sensitive column name and group labels; two groups keep the Male/Female schema
+    if spec.groups == 2:
+        return "sex", ["Male", "Female"]
+    return "group", [f"g{i}" for i in range(spec.groups)]
+
+def synthetic_truth(spec):
+    # The gaps a correct audit of the labels should report, up to sampling noise
+    rates = synthetic_rates(spec)
+    _, labels = synthetic_labels(spec)
+    return {
+        "selection_rates": dict(zip(labels, rates.tolist())),
+        "demographic_parity_difference": float(rates.max() - rates.min()),
+        "disparate_impact_ratio": float(rates.min() / rates.max()),
+    }
+
+def synthetic_chunk(spec, index, rates=None):
+    # Arrays for chunk `index`: numeric (n, k) float32, categorical codes
+    # (n, m), group codes and 0/1 labels
+    rates = synthetic_rates(spec) if rates is None else rates
+    n = min(spec.chunk_rows, spec.rows - index * spec.chunk_rows)
+    rng = np.random.default_rng([spec.seed, index])
+    weights = None if spec.group_weights is None else np.asarray(spec.group_weights) / sum(spec.group_weights)
+    groups = rng.choice(spec.groups, n, p=weights).astype(np.min_scalar_type(-spec.groups))
+    y = (rng.random(n) < rates[groups]).astype(np.int8)
+
+    numeric = rng.standard_normal((n, spec.numeric_features), dtype=np.float32)
+    weights = spec.signal / np.sqrt(np.arange(1, spec.numeric_features + 1, dtype=np.float32))
+    numeric += (y[:, None] - np.float32(0.5)) * weights
+    if spec.numeric_features and spec.proxy:
+        numeric[:, 0] -= np.float32(spec.proxy) * groups / (spec.groups - 1)
+
+    categorical = (spec.cardinality * rng.random((n, spec.categorical_features), dtype=np.float32) ** 2).astype(np.min_scalar_type(-spec.cardinality))
+    return numeric, categorical, groups, y
+
+def synthetic_frames(spec):
+    # DataFrame chunks with the sensitive column first and the label last,
+    # the layout detect_columns expects
+    rates = synthetic_rates(spec)
+    sensitive, labels = synthetic_labels(spec)
+    category_labels = [f"c{code}" for code in range(spec.cardinality)]
+    for index in range(-(-spec.rows // spec.chunk_rows)):
+        numeric, categorical, groups, y = synthetic_chunk(spec, index, rates)
+        frame = {sensitive: pd.Categorical.from_codes(groups, categories=labels)}
+        frame.update((f"num_{i}", numeric[:, i]) for i in range(spec.numeric_features))
+        frame.update((f"cat_{i}", pd.Categorical.from_codes(categorical[:, i], categories=category_labels)) for i in range(spec.categorical_features))
+        frame["approved"] = y
+        yield pd.DataFrame(frame)
+
+def synthetic_csv(frame, header):
+    # pyarrow's CSV writer is several times faster than DataFrame.to_csv
+    if pa is None:
+        return frame.to_csv(index=False, header=header).encode()
+    sink = io.BytesIO()
+    pa.csv.write_csv(pa.Table.from_pandas(frame, preserve_index=False), sink, pa.csv.WriteOptions(include_header=header, quoting_style="needed"))
+    return sink.getvalue()
+
+def write_synthetic(spec, path, fmt=None):
+    # Parquet (one row group per chunk) or CSV, gzip if the path ends in .gz;
+    # returns the row count written
+    fmt = fmt or ("parquet" if path.endswith(".parquet") else "csv")
+    if fmt not in ("parquet", "csv"):
+        raise ValueError(f"Unknown format '{fmt}', choose parquet or csv")
+    if fmt == "parquet" and pa is None:
+        raise ValueError("Parquet output needs pyarrow installed")
+    rows, writer = 0, None
+    with (gzip.open(path, "wb", compresslevel=GZIP_LEVEL) if path.endswith(".gz") else open(path, "wb")) as sink:
+        try:
+            for frame in synthetic_frames(spec):
+                if fmt == "parquet":
+                    table = pa.Table.from_pandas(frame, preserve_index=False)
+                    writer = writer or pa.parquet.ParquetWriter(sink, table.schema)
+                    writer.write_table(table)
+                else:
+                    sink.write(synthetic_csv(frame, header=rows == 0))
+                rows += len(frame)
+        finally:
+            if writer is not None:
+                writer.close()
+    return rows
+
+def generate_synthetic_data(n=2000, seed=None):
+    # Training backup: two groups, the five SYNTHETIC_FEATURES, and the
+    # first feature partly revealing sex so the tree can pick up the bias
+    spec = SyntheticSpec(rows=n, seed=0 if seed is None else seed, proxy=0.5, chunk_rows=max(n, 1))
+    if seed is None:
+        spec.seed = int(np.random.SeedSequence().entropy % 2**32)
+    numeric, _, groups, y = synthetic_chunk(spec, 0)
+    X = pd.DataFrame(numeric, columns=SYNTHETIC_FEATURES)
+    return X, pd.Series(y.astype(int)), pd.Series(groups).map({0: 'Male', 1: 'Female'})
+
+# --- HELPER: STREAMING CSV INGEST ---
+# Uploads are parsed chunk by chunk straight from the spooled temp file, so we
+# never hold the raw bytes, the decoded text and the parsed frame at once.
+INGEST_CHUNK_ROWS = int(os.environ.get("INGEST_CHUNK_ROWS", 100_000))
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+def open_csv_stream(raw):
+    # Sniff the first bytes to pick a decompressor; plain CSV is passed through
+    head = raw.read(4)
+    raw.seek(0)
+    if head.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=raw, mode="rb"), "gzip"
+    if head.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError("zstd-compressed upload received but the 'zstandard' package is not installed")
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=False), "zstd"
+    return raw, None
+
+SENSITIVE_NAMES = ['sex', 'gender', 'race', 'ethnicity', 'age']
+
+def detect_columns(df):
+    # Sensitive column: first well-known name, else the first text-based column
+    sensitive_col = next((col for col in df.columns if col.lower() in SENSITIVE_NAMES), None)
 
-# --- HELPER: PROCESS UPLOADED DATA ---
-def process_dataframe(df):
-    # 1. Clean Data
-    df = df.dropna()
-    
-    # 2. Identify Sensitive Column (Simple Auto-detection)
-    possible_sensitive = ['sex', 'gender', 'race', 'ethnicity', 'age']
-    sensitive_col = next((col for col in df.columns if col.lower() in possible_sensitive), None)
-    
     if not sensitive_col:
-        # Fallback: Pick first text-based column
-        sensitive_col = df.select_dtypes(include=['object', 'category']).columns[0]
+        text_cols = [col for col in df.columns if not pd.api.types.is_numeric_dtype(df[col])]
+        if not text_cols:
+            raise ValueError("Could not detect a sensitive column (no known name and no text columns)")
+        sensitive_col = text_cols[0]
 
-    # 3. Identify Target Column (Assume it's the last one)
+    # Target column: assume it's the last one
     target_col = df.columns[-1]
+    return sensitive_col, target_col
 
-    # 4. Split and Encode
-    y = df[target_col]
-    X = df.drop(columns=[target_col, sensitive_col])
-    sensitive = df[sensitive_col]
+def _as_category(col):
+    # Text columns are kept as categoricals while streaming: one small code per row
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col
+    return col.astype(str).astype("category")
 
-    # Encode Categorical Data to Numbers
-    le = LabelEncoder()
-    # Encode y if it's text (e.g., "Yes"/"No")
-    if y.dtype == 'object':
-        y = le.fit_transform(y)
-    
-    # One-hot encode X (features)
-    X = pd.get_dummies(X)
+def _numbers_as_category(col):
+    # A float32 column re-coded as text, whole numbers written as the CSV had
+    # them ("94103", not "94103.0"); each distinct value is formatted once
+    values, codes = np.unique(col.to_numpy(), return_inverse=True)
+    labels = [str(int(v)) if float(v).is_integer() else np.format_float_positional(v, trim="-") for v in values]
+    return pd.Series(pd.Categorical.from_codes(codes, labels), index=col.index)
+
+def _concat_columns(parts):
+    # Categoricals from different chunks can have different categories, and a
+    # plain pd.concat would fall back to object dtype, so union them instead.
+    if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+        return pd.api.types.union_categoricals(parts, sort_categories=True)
+    return pd.concat(parts)
+
+def _compact_target(y):
+    # 0/1 style targets fit in the smallest integer dtype
+    values = pd.to_numeric(y)
+    if (values % 1 == 0).all():
+        return pd.to_numeric(values, downcast="integer").to_numpy()
+    return values.to_numpy()
+
+# --- FEATURE ENCODER ---
+# Text columns become sparse indicator features. High-cardinality columns
+# (zip codes, employer names) are capped: either the top-K categories plus
+# an "other" column, or every category hashed into a shared bucket space.
+ENCODING_MODES = ("onehot", "hash")
+
+def fit_encoder(columns, categories, mode="onehot", max_categories=100, hash_buckets=1024):
+    if mode not in ENCODING_MODES:
+        raise ValueError(f"Unknown encoding '{mode}', choose from {ENCODING_MODES}")
+    if max_categories < 1 or hash_buckets < 1:
+        raise ValueError("max_categories and hash_buckets must be at least 1")
+    numeric = [col for col in columns if col not in categories]
+    names = list(numeric)
+    encoded = {}
+
+    for col, labels in categories.items():
+        if mode == "hash":
+            encoded[col] = {}
+            continue
+        # Most frequent categories keep their own column, the tail shares one
+        counts = np.bincount(columns[col], minlength=len(labels))
+        top = np.argsort(-counts, kind="stable")[:max_categories]
+        kept = {labels[code]: len(names) + slot for slot, code in enumerate(sorted(top))}
+        names.extend(f"{col}_{label}" for label in kept)
+        other = None
+        if len(labels) > len(kept):
+            other = len(names)
+            names.append(f"{col}_other")
+        encoded[col] = {"kept": kept, "other": other}
+
+    if mode == "hash" and categories:
+        names.extend(f"hash_{i}" for i in range(hash_buckets))
+
+    return {
+        "mode": mode,
+        "hash_buckets": hash_buckets,
+        "numeric": numeric,
+        "categorical": encoded,
+        "feature_names": names,
+        "features_before": len(numeric) + sum(len(labels) for labels in categories.values()),
+    }
+
+def category_slots(encoder, col, labels):
+    # Output column for each label; also used for labels never seen at fit time
+    if encoder["mode"] == "hash":
+        offset = len(encoder["numeric"])
+        buckets = encoder["hash_buckets"]
+        return np.array([offset + zlib.crc32(f"{col}={label}".encode()) % buckets for label in labels], dtype=np.int64)
+    spec = encoder["categorical"][col]
+    missing = -1 if spec["other"] is None else spec["other"]
+    return np.array([spec["kept"].get(label, missing) for label in labels], dtype=np.int64)
+
+def encode_sparse(columns, categories, encoder, rows=None):
+    # CSR design matrix built straight from codes: one COO triplet per
+    # non-zero numeric value and per categorical value, no dense detour
+    n = len(next(iter(columns.values()))) if rows is None else len(rows)
+    row_ids, col_ids, values = [], [], []
+
+    for slot, col in enumerate(encoder["numeric"]):
+        data = columns[col] if rows is None else columns[col][rows]
+        nonzero = np.flatnonzero(data)
+        row_ids.append(nonzero)
+        col_ids.append(np.full(len(nonzero), slot))
+        values.append(data[nonzero].astype(np.float32))
+
+    for col in encoder["categorical"]:
+        codes = columns[col] if rows is None else columns[col][rows]
+        slots = category_slots(encoder, col, categories[col])[codes]
+        present = slots >= 0
+        row_ids.append(np.flatnonzero(present))
+        col_ids.append(slots[present])
+        values.append(np.ones(present.sum(), dtype=np.float32))
+
+    shape = (n, len(encoder["feature_names"]))
+    if not row_ids:
+        return sparse.csr_matrix(shape, dtype=np.float32)
+    # Hash collisions within a row are summed, as in the usual hashing trick
+    return sparse.csr_matrix(
+        (np.concatenate(values), (np.concatenate(row_ids), np.concatenate(col_ids))),
+        shape=shape, dtype=np.float32,
+    )
+
+def encoding_report(dataset):
+    # Before/after feature counts and the footprint of dense vs sparse storage
+    encoder = dataset.encoder
+    n = len(dataset)
+    nnz = sum(int(np.count_nonzero(dataset.columns[col])) for col in encoder["numeric"]) + n * len(encoder["categorical"])
+    return {
+        "encoding": encoder["mode"],
+        "features_before": encoder["features_before"],
+        "features_after": len(encoder["feature_names"]),
+        "dense_mb": round(n * encoder["features_before"] * 4 / 2**20, 2),
+        "sparse_mb": round((nnz * 8 + (n + 1) * 4) / 2**20, 2),
+    }
+
+# --- UPLOAD-TIME SAMPLE INDEX ---
+# Training samples are prefixes of one row order built at upload, so a
+# request for n rows slices n indices instead of permuting the full dataset.
+# The order comes from a bottom-k reservoir filled while streaming, then
+# interleaved by (sensitive, target) stratum: every prefix is proportionally
+# stratified. Each sensitive group's first rows sit up front so small groups
+# are always represented, and those rows keep the group's label mix.
+SAMPLE_RESERVOIR_ROWS = int(os.environ.get("SAMPLE_RESERVOIR_ROWS", 1_000_000))
+SAMPLE_MIN_PER_GROUP = int(os.environ.get("SAMPLE_MIN_PER_GROUP", 30))
+# Cap on the guaranteed block, so many groups don't crowd out proportionality
+SAMPLE_RESERVED_ROWS = int(os.environ.get("SAMPLE_RESERVED_ROWS", 1000))
+SAMPLE_SEED = int(os.environ.get("SAMPLE_SEED", 7919))  # same upload, same samples
+
+class Reservoir:
+    # Every streamed row draws a random key and the k smallest keys survive,
+    # which is a uniform sample of k rows however long the stream is
+    def __init__(self, size, seed=SAMPLE_SEED):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.rows = np.empty(0, dtype=np.int64)
+        self.keys = np.empty(0)
+        self._bound = None  # largest surviving key once the reservoir is full
+
+    def add(self, start, count):
+        keys = self.rng.random(count)
+        rows = np.arange(start, start + count, dtype=np.int64)
+        if self._bound is not None:
+            keep = keys < self._bound
+            keys, rows = keys[keep], rows[keep]
+        self.keys = np.concatenate([self.keys, keys])
+        self.rows = np.concatenate([self.rows, rows])
+        if len(self.keys) >= 2 * self.size:
+            self._shrink()
+
+    def _shrink(self):
+        if len(self.keys) > self.size:
+            keep = np.argpartition(self.keys, self.size - 1)[:self.size]
+            self.keys, self.rows = self.keys[keep], self.rows[keep]
+            self._bound = self.keys.max()
+
+    def result(self):
+        self._shrink()
+        return self.rows, self.keys
+
+def _rank_within(labels, order):
+    # Rank of each row among rows with the same label, walking rows in order
+    counts = np.bincount(labels)
+    grouped = order[np.argsort(labels[order], kind="stable")]
+    rank = np.empty(len(labels), dtype=np.int64)
+    rank[grouped] = np.arange(len(labels)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return rank, counts
+
+def stratified_order(rows, keys, strata, groups, min_per_group=SAMPLE_MIN_PER_GROUP):
+    # Within a stratum rows keep their key order (a uniform nested sample).
+    # Row r of a stratum with c rows is placed at (r + 0.5) / c, so any prefix
+    # takes each stratum in proportion. Then the first min_per_group rows of
+    # every sensitive group, in that proportional order (so in the group's own
+    # label mix), go first, round-robin, smallest groups first. Returns the
+    # ordered rows and their keys (kept so later appends can extend it).
+    by_key = np.argsort(keys, kind="stable")
+    rows, keys, strata, groups = rows[by_key], keys[by_key], strata[by_key], groups[by_key]
+    rank, counts = _rank_within(strata, np.arange(len(rows)))
+    position = (rank + 0.5) / counts[strata]
+
+    group_rank, group_counts = _rank_within(groups, np.argsort(position, kind="stable"))
+    min_per_group = min(min_per_group, max(1, SAMPLE_RESERVED_ROWS // max(np.count_nonzero(group_counts), 1)))
+    front = group_rank < min_per_group
+    position[front] = group_rank[front] - min_per_group
+    order = np.lexsort((group_counts[groups], position))
+    return rows[order], keys[order]
+
+def build_sample_order(y, sensitive_codes, reservoir=None):
+    # Defaults to a reservoir over every row (e.g. for datasets built in one go)
+    if reservoir is None:
+        reservoir = Reservoir(SAMPLE_RESERVOIR_ROWS)
+        reservoir.add(0, len(y))
+    rows, keys = reservoir.result()
+    _, target_codes = np.unique(y[rows], return_inverse=True)
+    groups = sensitive_codes[rows].astype(np.int64)
+    strata = groups * (target_codes.max(initial=0) + 1) + target_codes
+    return stratified_order(rows, keys, strata, groups)
+
+# --- COMPACT DATASET STORAGE ---
+# Processed uploads are stored column-wise: integer category codes for text
+# columns, float32 for numerics, and the sensitive attribute as a code array.
+# One-hot expansion only happens for the rows a request actually trains on.
+APPEND_GROWTH = 1.5  # spare room reserved behind a column when appends reallocate it
+
+def _buffer_nbytes(values):
+    # Bytes held for a column, including room reserved for appends
+    base = values.base
+    if isinstance(base, np.ndarray) and base.ndim == 1 and base.dtype == values.dtype and base.ctypes.data == values.ctypes.data:
+        return base.nbytes
+    return values.nbytes
+
+def _append_array(values, extra, in_place=True):
+    # values followed by extra, written into the spare room behind values
+    # when it has some (and in_place), so an append copies the batch, not
+    # the history. Only the region past len(values) is written: views of the
+    # old length (the pre-append dataset) stay valid.
+    n, k = len(values), len(extra)
+    dtype = np.result_type(values, extra)
+    base = values.base
+    if (
+        in_place and dtype == values.dtype and isinstance(base, np.ndarray) and base.ndim == 1 and base.dtype == dtype
+        and base.flags.writeable and base.ctypes.data == values.ctypes.data and len(base) >= n + k
+    ):
+        grown = base[:n + k]
+    else:
+        grown = np.empty(int((n + k) * APPEND_GROWTH), dtype=dtype)[:n + k]
+        grown[:n] = values
+    grown[n:] = extra
+    return grown
+
+class ProcessedDataset:
+    def __init__(self, columns, categories, y, sensitive_codes, sensitive_labels, sensitive_name, target_name, encoder=None, sample_order=None, target_labels=None, sample_keys=None):
+        self.columns = columns              # name -> np.ndarray (codes or float32)
+        self.categories = categories        # name -> labels, for coded columns only
+        self.encoder = encoder or fit_encoder(columns, categories)
+        self.y = y
+        self.sensitive_codes = sensitive_codes
+        if sample_order is None:
+            sample_order, sample_keys = build_sample_order(y, sensitive_codes)
+        self.sample_order = sample_order
+        self.sample_keys = sample_keys      # reservoir key of each sample_order row, None if unknown
+        self.sensitive_labels = sensitive_labels
+        self.sensitive_name = sensitive_name
+        self.target_name = target_name
+        self.target_labels = target_labels  # for text targets, label of each code in y
+        self.extended = False               # an append already owns the spare room behind the columns
+
+    def __len__(self):
+        return len(self.y)
+
+    @property
+    def nbytes(self):
+        arrays = [*self.columns.values(), self.y, self.sensitive_codes, self.sample_order]
+        keys = 0 if self.sample_keys is None else self.sample_keys.nbytes
+        return int(sum(_buffer_nbytes(values) for values in arrays) + keys)
+
+    def attribute(self, name, rows):
+        # (codes, labels) of a column for the given rows, for group-bys;
+        # numeric columns are bucketed (age into fixed bands)
+        if name == self.sensitive_name:
+            values = pd.to_numeric(pd.Series(self.sensitive_labels), errors="coerce").to_numpy()
+            if len(values) > MAX_DISCRETE_NUMERIC and not np.isnan(values).any():
+                # A numeric sensitive column (e.g. raw age) is stored with one label per value
+                return bucket_numeric(name, values[self.sensitive_codes[rows]])
+            return self.sensitive_codes[rows], self.sensitive_labels
+        if name not in self.columns:
+            raise KeyError(f"Unknown column '{name}', choose from {[self.sensitive_name, *self.columns]}")
+        if name in self.categories:
+            return self.columns[name][rows], self.categories[name]
+        return bucket_numeric(name, self.columns[name][rows])
+
+    def sample_rows(self, n, seed=None):
+        # Sorted row ids of an n-row training sample, or None for all rows
+        if n >= len(self):
+            return None
+        if n <= len(self.sample_order):
+            return np.sort(self.sample_order[:n])
+        # Larger than the reservoir: fall back to a full random draw
+        return np.sort(np.random.RandomState(seed).choice(len(self), n, replace=False))
+
+    def design_matrix(self, rows=None):
+        # Sparse CSR features for the requested rows only
+        return encode_sparse(self.columns, self.categories, self.encoder, rows)
+
+    def target(self, rows=None):
+        values = self.y if rows is None else self.y[rows]
+        return pd.Series(values, name=self.target_name, index=np.arange(len(self)) if rows is None else rows)
+
+    def sensitive(self, rows=None):
+        codes = self.sensitive_codes if rows is None else self.sensitive_codes[rows]
+        return pd.Series(
+            pd.Categorical.from_codes(codes, categories=self.sensitive_labels),
+            name=self.sensitive_name, index=np.arange(len(self)) if rows is None else rows,
+        )
+
+    # --- Arrow spill: one uncompressed IPC file, read back through mmap ---
+    def spill(self, path):
+        arrays = {f"x:{col}": values for col, values in self.columns.items()}
+        arrays["y"] = self.y
+        arrays["sensitive"] = self.sensitive_codes
+        # The sample order is shorter than the table, so store each row's
+        # position in it (-1 = not sampled) as a column
+        rank = np.full(len(self), -1, dtype=np.int64)
+        rank[self.sample_order] = np.arange(len(self.sample_order))
+        arrays["sample_rank"] = rank
+        if self.sample_keys is not None:
+            keys = np.full(len(self), np.nan)
+            keys[self.sample_order] = self.sample_keys
+            arrays["sample_key"] = keys
+        meta = {
+            "columns": list(self.columns),
+            "categories": self.categories,
+            "sensitive_labels": self.sensitive_labels,
+            "sensitive_name": self.sensitive_name,
+            "target_name": self.target_name,
+            "target_labels": self.target_labels,
+            "encoder": self.encoder,
+        }
+        table = pa.table({name: pa.array(values) for name, values in arrays.items()})
+        table = table.replace_schema_metadata({"auditor": json.dumps(meta)})
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    @classmethod
+    def load(cls, path):
+        # Zero-copy: every column is a single null-free primitive chunk, so
+        # to_numpy() hands back a view into the memory-mapped file
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        meta = json.loads(table.schema.metadata[b"auditor"])
+
+        def view(name):
+            return table.column(name).chunk(0).to_numpy(zero_copy_only=True)
+
+        rank = view("sample_rank")
+        sampled = np.flatnonzero(rank >= 0)
+        sample_order = np.empty(len(sampled), dtype=np.int64)
+        sample_order[rank[sampled]] = sampled
+        sample_keys = view("sample_key")[sample_order] if "sample_key" in table.column_names else None
+
+        return cls(
+            columns={col: view(f"x:{col}") for col in meta["columns"]},
+            categories=meta["categories"],
+            y=view("y"),
+            sensitive_codes=view("sensitive"),
+            sensitive_labels=meta["sensitive_labels"],
+            sensitive_name=meta["sensitive_name"],
+            target_name=meta["target_name"],
+            encoder=meta["encoder"],
+            sample_order=sample_order,
+            target_labels=meta.get("target_labels"),
+            sample_keys=sample_keys,
+        )
+
+def process_chunks(chunks, encoding=None, clock=None):
+    rows = 0
+    sensitive_col = target_col = None
+    text_features = []
+    X_parts, y_parts, s_parts = [], [], []
+    reservoir, kept = Reservoir(SAMPLE_RESERVOIR_ROWS), 0
+
+    # A caller's clock is recorded by the caller
+    own_clock = clock is None
+    if own_clock:
+        clock = StageClock("dropna", "encode", "sample_index")
+
+    for chunk in chunks:
+        rows += len(chunk)
+
+        # 1. Clean Data
+        started, rss = time.perf_counter(), current_rss()
+        chunk = chunk.dropna()
+        clock.add("dropna", started, rss)
+        if chunk.empty:
+            continue
+        started, rss = time.perf_counter(), current_rss()
+
+        # 2. Identify Sensitive/Target Columns (from the first non-empty chunk)
+        if sensitive_col is None:
+            sensitive_col, target_col = detect_columns(chunk)
+            text_features = [
+                col for col in chunk.columns
+                if col not in (sensitive_col, target_col) and not pd.api.types.is_numeric_dtype(chunk[col])
+            ]
+            y_is_text = not pd.api.types.is_numeric_dtype(chunk[target_col])
+        elif not y_is_text and not pd.api.types.is_numeric_dtype(chunk[target_col]):
+            y_is_text = True
+            y_parts = [_as_category(part) for part in y_parts]
+
+        # 3. Split and Encode incrementally (float32 numerics, categorical text)
+        X_chunk = chunk.drop(columns=[target_col, sensitive_col])
+        for col in X_chunk.columns:
+            if col not in text_features:
+                numeric = pd.to_numeric(X_chunk[col], errors="coerce")
+                if numeric.isna().any():
+                    # Text in a column earlier chunks had as numbers (say
+                    # zip codes like "K1A"): the whole column becomes text
+                    text_features.append(col)
+                    for part in X_parts:
+                        part[col] = _numbers_as_category(part[col])
+                else:
+                    X_chunk[col] = numeric.astype(np.float32)
+            if col in text_features:
+                X_chunk[col] = _as_category(X_chunk[col])
+        X_parts.append(X_chunk)
+        y_parts.append(_as_category(chunk[target_col]) if y_is_text else chunk[target_col])
+        s_parts.append(_as_category(chunk[sensitive_col]))
+        clock.add("encode", started, rss)
+
+        started, rss = time.perf_counter(), current_rss()
+        reservoir.add(kept, len(chunk))
+        kept += len(chunk)
+        clock.add("sample_index", started, rss)
+
+    if sensitive_col is None:
+        raise ValueError("No complete rows found in the uploaded data")
+
+    started, rss = time.perf_counter(), current_rss()
+    columns, categories = {}, {}
+    for col in X_parts[0].columns:
+        merged = _concat_columns([part[col] for part in X_parts])
+        if col in text_features:
+            columns[col] = np.asarray(merged.codes)
+            categories[col] = [str(label) for label in merged.categories]
+        else:
+            columns[col] = merged.to_numpy(dtype=np.float32)
+        del merged
+
+    # Encode y if it's text (e.g., "Yes"/"No") - sorted categories match LabelEncoder
+    y = _concat_columns(y_parts)
+    y_labels = y.categories if y_is_text else None
+    y = np.asarray(y.codes) if y_is_text else _compact_target(y)
+
+    sensitive = _concat_columns(s_parts)
+    sensitive_codes = np.asarray(sensitive.codes)
+    clock.add("encode", started, rss)
+
+    started, rss = time.perf_counter(), current_rss()
+    sample_order, sample_keys = build_sample_order(y, sensitive_codes, reservoir)
+    clock.add("sample_index", started, rss)
+
+    started, rss = time.perf_counter(), current_rss()
+    dataset = ProcessedDataset(
+        columns=columns,
+        categories=categories,
+        y=y,
+        sensitive_codes=sensitive_codes,
+        sensitive_labels=[str(label) for label in sensitive.categories],
+        sensitive_name=sensitive_col,
+        target_name=target_col,
+        encoder=fit_encoder(columns, categories, **(encoding or {})),
+        sample_order=sample_order,
+        target_labels=[str(label) for label in y_labels] if y_is_text else None,
+        sample_keys=sample_keys,
+    )
+    clock.add("encode", started, rss)
+    if own_clock:
+        clock.record()
+    return dataset, rows
+
+def ingest_csv(raw, encoding=None):
+    stream, compression = open_csv_stream(raw)
+    chunk_count = 0
+
+    # One clock for parsing and processing, so its RSS peak covers the whole ingest
+    clock = StageClock("csv_decode", "dropna", "encode", "sample_index")
+
+    def counted(reader):
+        # Time only the parser's work, not what the consumer does per chunk
+        nonlocal chunk_count
+        while True:
+            started, rss = time.perf_counter(), current_rss()
+            chunk = next(reader, None)
+            clock.add("csv_decode", started, rss)
+            if chunk is None:
+                return
+            chunk_count += 1
+            yield chunk
+
+    with pd.read_csv(stream, chunksize=INGEST_CHUNK_ROWS) as reader:
+        dataset, rows = process_chunks(counted(reader), encoding, clock)
+    clock.record()
+
+    stats = {"rows": rows, "chunks": chunk_count, "compression": compression, "peak_rss_growth_mb": clock.peak_growth_mb()}
+    return dataset, stats
+
+def content_hash(raw):
+    # Hash the decompressed CSV so plain and compressed uploads of the same
+    # data map to the same dataset. One cheap pass, constant memory.
+    stream, _ = open_csv_stream(raw)
+    digest = hashlib.sha256()
+    with stage("content_hash"):
+        for block in iter(lambda: stream.read(1 << 20), b""):
+            digest.update(block)
+    raw.seek(0)
+    return digest.hexdigest()
+
+def dataset_key(digest, encoder_config):
+    # Same bytes encoded differently are different datasets
+    return hashlib.sha256(f"{digest}:{json.dumps(encoder_config, sort_keys=True)}".encode()).hexdigest()[:16]
 
-    return X, y, sensitive
+# --- HELPER: PROCESS UPLOADED DATA ---
+def process_dataframe(df, encoding=None):
+    # In-memory frames are just a single-chunk stream
+    dataset, _ = process_chunks([df], encoding)
+    return dataset.design_matrix(), dataset.target(), dataset.sensitive()
+
+# --- DATASET REGISTRY ---
+# Processed uploads keyed by content hash, so every auditor gets their own
+# dataset and re-uploading identical bytes skips parsing entirely.
+DATASET_MEMORY_BUDGET_MB = float(os.environ.get("DATASET_MEMORY_BUDGET_MB", 1024))
+DATASET_SPILL_DIR = os.environ.get("DATASET_SPILL_DIR", os.path.join(tempfile.gettempdir(), "algorithmic-auditor"))
+
+class DatasetRegistry:
+    # Spill writes and reloads run outside the lock, so a multi-GB spill
+    # doesn't hold up every other request. A dataset being written out stays
+    # readable from _spilling until its file is complete.
+    def __init__(self, budget_bytes, spill_dir=None):
+        self.budget_bytes = budget_bytes
+        self.spill_dir = spill_dir
+        self._entries = OrderedDict()
+        self._spilling = {}  # dataset_id -> entry, while its spill file is written
+        self._spilled = {}  # dataset_id -> (path, info) of cold datasets on disk
+        self._lock = threading.Lock()
+
+    def get(self, dataset_id):
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is not None:
+                self._entries.move_to_end(dataset_id)
+                return entry
+            if dataset_id in self._spilling:
+                return self._spilling[dataset_id]
+            spilled = self._spilled.get(dataset_id)
+        if spilled is None:
+            return None
+
+        # Cold dataset: map it back in instead of re-running the pipeline
+        path, info = spilled
+        dataset = ProcessedDataset.load(path)
+        with self._lock:
+            if dataset_id in self._entries:  # another request loaded it first
+                return self._entries[dataset_id]
+            if self._spilled.pop(dataset_id, None) is None:  # removed meanwhile
+                return None
+            entry = {"dataset": dataset, "info": info}
+            _, pending = self._insert(dataset_id, entry)
+        # The mapping stays valid after the unlink; a later eviction rewrites it
+        _remove_file(path)
+        self._spill(pending)
+        return entry
+
+    def put(self, dataset_id, entry):
+        with self._lock:
+            evicted, pending = self._insert(dataset_id, entry)
+        self._spill(pending)
+        return evicted
+
+    def close(self):
+        # Server shutdown: spill files are only useful to this process
+        with self._lock:
+            paths = [path for path, _ in self._spilled.values()]
+            self._spilled.clear()
+        for path in paths:
+            _remove_file(path)
+
+    def _insert(self, dataset_id, entry):
+        # Push least-recently-used datasets out until we're back under budget.
+        # The newest dataset is always kept, even if it alone exceeds it.
+        # Returns the evicted ids and the entries the caller must _spill.
+        evicted, pending = [], []
+        self._entries[dataset_id] = entry
+        self._entries.move_to_end(dataset_id)
+        while len(self._entries) > 1 and self.nbytes() > self.budget_bytes:
+            old_id, old_entry = self._entries.popitem(last=False)
+            if pa is not None and self.spill_dir:
+                self._spilling[old_id] = old_entry
+                pending.append((old_id, old_entry))
+            evicted.append(old_id)
+        return evicted, pending
+
+    def _spill(self, pending):
+        for old_id, old_entry in pending:
+            path = os.path.join(self.spill_dir, f"{old_id}.arrow")
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            try:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                old_entry["dataset"].spill(tmp_path)
+                os.replace(tmp_path, path)
+            except OSError:
+                _remove_file(tmp_path)
+                path = None
+            with self._lock:
+                # Still wanted on disk: not removed, nor put back meanwhile
+                keep = self._spilling.pop(old_id, None) is not None and old_id not in self._entries
+                if keep and path is not None:
+                    self._spilled[old_id] = (path, old_entry["info"])
+            if path is not None and not keep:
+                _remove_file(path)
+
+    def nbytes(self):
+        return sum(entry["dataset"].nbytes for entry in self._entries.values())
+
+    def used_bytes(self):
+        with self._lock:
+            return self.nbytes()
+
+    def summary(self):
+        with self._lock:
+            return {
+                "budget_mb": round(self.budget_bytes / 2**20, 1),
+                "used_mb": round(self.nbytes() / 2**20, 1),
+                "datasets": [
+                    {"dataset_id": dataset_id, "rows": len(entry["dataset"]), "mb": round(entry["dataset"].nbytes / 2**20, 2)}
+                    for dataset_id, entry in self._entries.items()
+                ],
+                "spilled": sorted(self._spilled),
+            }
+
+def _remove_file(path):
+    with suppress(OSError):
+        os.remove(path)
+
+registry = DatasetRegistry(DATASET_MEMORY_BUDGET_MB * 2**20, DATASET_SPILL_DIR)
+
+# --- RESUMABLE UPLOADS ---
+# Large files arrive in chunks (PUT at an offset) into a temp file, so a
+# dropped connection resumes from the last byte received instead of
+# starting over. Sessions idle for longer than UPLOAD_TTL_S are deleted.
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "algorithmic-auditor", "uploads"))
+UPLOAD_TTL_S = int(os.environ.get("UPLOAD_TTL_S", 3600))
+UPLOAD_MAX_MB = int(os.environ.get("UPLOAD_MAX_MB", 20480))
+
+class UploadSessions:
+    def __init__(self, root, ttl_s):
+        self.root = root
+        self.ttl_s = ttl_s
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, size, params):
+        self.expire()
+        os.makedirs(self.root, exist_ok=True)
+        upload_id = uuid.uuid4().hex[:16]
+        path = os.path.join(self.root, upload_id)
+        open(path, "wb").close()
+        with self._lock:
+            self._sessions[upload_id] = {"path": path, "size": size, "offset": 0, "params": params, "busy": False, "touched": time.time()}
+        return upload_id
+
+    def status(self, upload_id):
+        with self._lock:
+            session = self._get(upload_id)
+            return {"upload_id": upload_id, "offset": session["offset"], "size": session["size"], "complete": session["offset"] == session["size"]}
+
+    def begin_write(self, upload_id, offset):
+        # One writer at a time, and only at the current end of the file
+        with self._lock:
+            session = self._get(upload_id)
+            if session["busy"] or offset != session["offset"]:
+                raise ValueError(session["offset"])
+            session["busy"] = True
+            return session["path"], session["size"]
+
+    def end_write(self, upload_id, offset):
+        with self._lock:
+            session = self._get(upload_id)
+            session.update(offset=offset, busy=False, touched=time.time())
+
+    def take(self, upload_id):
+        # Hand a fully received upload over for processing
+        with self._lock:
+            session = self._get(upload_id)
+            if session["busy"] or session["offset"] != session["size"]:
+                raise ValueError(session["offset"])
+            return self._sessions.pop(upload_id)
+
+    def expire(self):
+        cutoff = time.time() - self.ttl_s
+        with self._lock:
+            stale = [upload_id for upload_id, session in self._sessions.items() if session["touched"] < cutoff and not session["busy"]]
+            paths = [self._sessions.pop(upload_id)["path"] for upload_id in stale]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _get(self, upload_id):
+        session = self._sessions.get(upload_id)
+        if session is None:
+            raise KeyError(upload_id)
+        return session
+
+uploads = UploadSessions(UPLOAD_DIR, UPLOAD_TTL_S)
+
+GROUP_MIN_SUPPORT = int(os.environ.get("GROUP_MIN_SUPPORT", 30))  # test rows a subgroup needs to be compared
+FAST_TOL = float(os.environ.get("FAST_TOL", 1e-3))  # fast mitigation stops once violation and objective move less than this
 
 class TrainRequest(BaseModel):
     n_samples: int = 2000
+    dataset_id: Optional[str] = None
+    seed: int = 42
+    bootstrap: int = Field(0, ge=0, le=100_000)  # resamples for confidence intervals, 0 = off
+    ci_level: float = Field(0.95, gt=0, lt=1)
+    sensitive_columns: Optional[List[str]] = None  # audit their intersections, e.g. ["race", "gender", "age"]
+    min_support: int = Field(GROUP_MIN_SUPPORT, ge=1)  # smaller test subgroups are left out of gaps
+    fast: bool = False  # mitigation warm-starts from this dataset's last run and stops early
+    tol: float = Field(FAST_TOL, gt=0)
+    coarse_fraction: Optional[float] = Field(None, gt=0, lt=1)  # fast only: solve on this share of rows first
+
+def load_training_data(req):
+    # USE THE REQUESTED UPLOAD IF GIVEN, ELSE SYNTHETIC
+    if req.dataset_id is None:
+        return generate_synthetic_data(req.n_samples, seed=req.seed)
+
+    entry = registry.get(req.dataset_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or evicted dataset_id '{req.dataset_id}', please upload the file again")
+
+    dataset = entry["dataset"]
+    # Prefix of the upload-time sample order, then expand only those rows
+    with stage("sample"):
+        rows = dataset.sample_rows(req.n_samples, req.seed)
+    with stage("design_matrix"):
+        X = dataset.design_matrix(rows)
+    return X, dataset.target(rows), dataset.sensitive(rows)
+
+def intersection_groups(req, sensitive):
+    # Combined subgroup codes for the sampled rows (aligned with the
+    # sensitive Series' row index), or None when none were requested
+    if not req.sensitive_columns:
+        return None
+    if req.dataset_id is None:
+        raise HTTPException(status_code=400, detail="Intersectional audits need an uploaded dataset_id")
+    dataset = registry.get(req.dataset_id)["dataset"]
+    rows = sensitive.index.to_numpy()
+    try:
+        parts = [(name, *dataset.attribute(name, rows)) for name in dict.fromkeys(req.sensitive_columns)]
+        codes, labels = combine_codes(parts)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e).strip("'\""))
+    return {
+        "codes": pd.Series(codes, index=sensitive.index),
+        "labels": labels,
+        "attributes": [name for name, _, _ in parts],
+        "min_support": req.min_support,
+    }
+
+# --- FAIRNESS METRICS ENGINE ---
+# Every group metric comes from one np.bincount over (group, y_true, y_pred)
+# cells, so any number of groups costs a single pass over the predictions.
+CONFUSION_CELLS = ("tn", "fp", "fn", "tp")
+
+def group_codes(sensitive):
+    # Integer codes 0..G-1 plus their labels, for any sensitive column
+    if isinstance(sensitive, pd.Series) and isinstance(sensitive.dtype, pd.CategoricalDtype):
+        return np.asarray(sensitive.cat.codes), [str(label) for label in sensitive.cat.categories]
+    codes, labels = pd.factorize(np.asarray(sensitive), sort=True)
+    return codes, [str(label) for label in labels]
+
+def confusion_counts(y_true, y_pred, codes, n_groups):
+    # Shape (G, 4): tn, fp, fn, tp per group; any non-zero label is positive
+    cells = codes.astype(np.int64) * 4 + (np.asarray(y_true) != 0) * 2 + (np.asarray(y_pred) != 0)
+    return np.bincount(cells, minlength=n_groups * 4).reshape(n_groups, 4)
+
+def _ratio(num, den):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den > 0, num / np.maximum(den, 1), np.nan)
+
+def _spread(values):
+    values = values[~np.isnan(values)]
+    return float(values.max() - values.min()) if len(values) else 0.0
+
+def _num(value):
+    # JSON has no NaN: undefined rates (empty denominators) become null
+    return None if np.isnan(value) else float(value)
+
+def group_rates(counts):
+    # Per-group support and rate arrays, NaN where a rate is undefined
+    tn, fp, fn, tp = counts.T.astype(np.float64)
+    support = tn + fp + fn + tp
+    return support, {
+        "selection_rate": _ratio(fp + tp, support),
+        "accuracy": _ratio(tp + tn, support),
+        "tpr": _ratio(tp, tp + fn),
+        "fpr": _ratio(fp, fp + tn),
+        "precision": _ratio(tp, tp + fp),
+    }
+
+def metrics_from_counts(counts, labels):
+    tn, fp, fn, tp = counts.T.astype(np.float64)
+    support, rates = group_rates(counts)
+
+    selection = rates["selection_rate"][~np.isnan(rates["selection_rate"])]
+    total = support.sum()
+    return {
+        "accuracy": float((tp.sum() + tn.sum()) / total) if total else 0.0,
+        "demographic_parity_difference": _spread(rates["selection_rate"]),
+        "equalized_odds_difference": max(_spread(rates["tpr"]), _spread(rates["fpr"])),
+        "disparate_impact_ratio": float(selection.min() / selection.max()) if len(selection) and selection.max() > 0 else None,
+        "groups": {
+            label: {"support": int(support[i]), **{name: _num(values[i]) for name, values in rates.items()}}
+            for i, label in enumerate(labels) if support[i] > 0
+        },
+    }
+
+def group_metrics(y_true, y_pred, sensitive):
+    codes, labels = group_codes(sensitive)
+    return metrics_from_counts(confusion_counts(y_true, y_pred, codes, len(labels)), labels)
+
+def bootstrap_intervals(counts, labels, n_resamples, ci_level=0.95, seed=None):
+    # Resampling test rows with replacement only changes how many rows land in
+    # each (group, y_true, y_pred) cell, so each replicate is one multinomial
+    # draw over the cells: a (B, G, 4) batch, independent of the row count.
+    n = counts.sum()
+    rng = np.random.default_rng(seed)
+    draws = rng.multinomial(n, counts.ravel() / n, size=n_resamples).reshape(n_resamples, *counts.shape)
+    tn, fp, fn, tp = np.moveaxis(draws, -1, 0).astype(np.float64)
+    selection = _ratio(fp + tp, tn + fp + fn + tp)          # (B, G), NaN if a group drew no rows
+    accuracy = (tp + tn).sum(axis=1) / n
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        gap = np.nanmax(selection, axis=1) - np.nanmin(selection, axis=1)
+        alpha = (1 - ci_level) / 2
+        bounds = lambda values: np.nanquantile(values, [alpha, 1 - alpha], axis=0)
+        rate_bounds = bounds(selection)
+
+    present = counts.sum(axis=1) > 0
+    return {
+        "level": ci_level,
+        "n_resamples": n_resamples,
+        "accuracy": [float(v) for v in bounds(accuracy)],
+        "bias_gap": [float(v) for v in bounds(gap)],
+        "selection_rates": {
+            label: [_num(rate_bounds[0, i]), _num(rate_bounds[1, i])]
+            for i, label in enumerate(labels) if present[i]
+        },
+    }
+
+def summarize_predictions(y_test, y_pred, s_test, bootstrap=0, ci_level=0.95, seed=None, subgroups=None):
+    # Response payload shared by every training endpoint. subgroups (from
+    # intersection_groups) adds subgroup metrics for the same test rows.
+    codes, labels = group_codes(s_test)
+    counts = confusion_counts(y_test, y_pred, codes, len(labels))
+    metrics = metrics_from_counts(counts, labels)
+    groups = metrics["groups"]
+
+    def rate(*names):
+        # Handle cases where keys might be 0/1 instead of strings
+        group = next((groups[name] for name in names if name in groups), None)
+        return group["selection_rate"] if group else 0.0
+
+    return {
+        "accuracy": metrics["accuracy"],
+        "bias_gap": metrics["demographic_parity_difference"],
+        "female_rate": rate("Female", "1"),
+        "male_rate": rate("Male", "0"),
+        "equalized_odds_difference": metrics["equalized_odds_difference"],
+        "disparate_impact_ratio": metrics["disparate_impact_ratio"],
+        "groups": groups,
+        "confidence_intervals": bootstrap_intervals(counts, labels, bootstrap, ci_level, seed) if bootstrap else None,
+        "intersectional": None if subgroups is None else intersectional_metrics(
+            y_test, y_pred, subgroups["codes"].loc[s_test.index].to_numpy(), subgroups["labels"], subgroups["attributes"], subgroups["min_support"],
+        ),
+    }
+
+# --- INTERSECTIONAL GROUPS ---
+# Several sensitive attributes are combined into one integer code per row
+# (mixed radix, then np.unique to keep only combinations that occur), so
+# hundreds of subgroups still cost a single bincount.
+AGE_BANDS = [18, 25, 35, 45, 55, 65]
+NUMERIC_BUCKETS = 4          # quantile buckets for other numeric attributes
+MAX_DISCRETE_NUMERIC = 10    # numeric columns with few values are used as-is
+
+def is_age_column(name):
+    # "age" as a whole word of the name ("age", "applicant_age"), not "wage"
+    return "age" in re.split(r"[^a-z0-9]+", name.lower())
+
+def age_bands(values):
+    # Fixed bands, so codes agree across chunks and datasets
+    edges = np.array(AGE_BANDS, dtype=np.float64)
+    labels = [f"<{edges[0]:g}"] + [f"{lo:g}-{hi - 1:g}" for lo, hi in zip(edges[:-1], edges[1:])] + [f"{edges[-1]:g}+"]
+    return np.searchsorted(edges, values, side="right"), labels
+
+def bucket_numeric(name, values):
+    # Integer codes and labels for a numeric attribute
+    distinct = np.unique(values)
+    if len(distinct) <= MAX_DISCRETE_NUMERIC:
+        codes = np.searchsorted(distinct, values)
+        return codes, [f"{value:g}" for value in distinct]
+    if is_age_column(name):
+        return age_bands(values)
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, NUMERIC_BUCKETS + 1)[1:-1]))
+    bounds = [f"{edge:.3g}" for edge in edges]
+    labels = [f"<{bounds[0]}"] + [f"{lo}-{hi}" for lo, hi in zip(bounds[:-1], bounds[1:])] + [f"{bounds[-1]}+"]
+    return np.searchsorted(edges, values, side="right"), labels
+
+def combine_codes(parts):
+    # parts: [(name, codes, labels)] -> (codes 0..G-1, "a=x, b=y" labels)
+    if np.prod([float(len(labels)) for _, _, labels in parts]) >= 2**62:
+        raise ValueError("Too many attribute combinations to encode, use fewer or coarser attributes")
+    combined = np.zeros(len(parts[0][1]), dtype=np.int64)
+    for _, codes, labels in parts:
+        combined = combined * len(labels) + codes
+    observed, inverse = np.unique(combined, return_inverse=True)
+
+    # Decode labels for the observed combinations only, all at once
+    names, remainder = None, observed
+    for name, _, labels in reversed(parts):
+        remainder, digit = np.divmod(remainder, len(labels))
+        part = np.array([f"{name}={label}" for label in labels], dtype=object)[digit]
+        names = part if names is None else part + ", " + names
+    return inverse, list(names)
+
+def worst_groups(support, rates, labels):
+    # Extreme subgroup per metric, among groups that passed min_support
+    picks = {
+        "lowest_selection_rate": ("selection_rate", np.nanargmin),
+        "highest_selection_rate": ("selection_rate", np.nanargmax),
+        "lowest_accuracy": ("accuracy", np.nanargmin),
+        "lowest_tpr": ("tpr", np.nanargmin),
+        "highest_fpr": ("fpr", np.nanargmax),
+    }
+    worst = {}
+    for name, (metric, pick) in picks.items():
+        values = rates[metric]
+        if np.isnan(values).all():
+            worst[name] = None
+            continue
+        i = pick(values)
+        worst[name] = {"group": labels[i], "value": float(values[i]), "support": int(support[i])}
+    return worst
+
+def intersectional_metrics(y_test, y_pred, codes, labels, attributes, min_support):
+    return subgroup_metrics(confusion_counts(y_test, y_pred, codes, len(labels)), labels, attributes, min_support)
+
+def subgroup_metrics(counts, labels, attributes, min_support):
+    support = counts.sum(axis=1)
+    kept = np.flatnonzero(support >= min_support)
+    kept_labels = [labels[i] for i in kept]
+    metrics = metrics_from_counts(counts[kept], kept_labels)
+    kept_support, rates = group_rates(counts[kept])
+    return {
+        "attributes": attributes,
+        "min_support": min_support,
+        "groups_observed": int(np.count_nonzero(support)),
+        "groups_reported": len(kept),
+        "rows_below_support": int(support.sum() - kept_support.sum()),
+        "demographic_parity_difference": metrics["demographic_parity_difference"],
+        "equalized_odds_difference": metrics["equalized_odds_difference"],
+        "disparate_impact_ratio": metrics["disparate_impact_ratio"],
+        "worst_groups": worst_groups(kept_support, rates, kept_labels),
+        "groups": metrics["groups"],
+    }
+
+# --- RESULT CACHE ---
+# Fitted models and their metrics, keyed on everything that determines them.
+# Tier 1 is an in-memory LRU, tier 2 is the metrics as JSON on local disk
+# (models are served from the artifact store, so never unpickled from here),
+# in a directory only this user can write, capped by entry count.
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 128))
+RESULT_CACHE_DISK_ENTRIES = int(os.environ.get("RESULT_CACHE_DISK_ENTRIES", 2048))
+_USER_TAG = str(os.getuid()) if hasattr(os, "getuid") else "user"
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), f"algorithmic-auditor-{_USER_TAG}", "results"))
+cache_log = logging.getLogger("auditor.cache")
+
+def private_dir(path):
+    # Create path as 0o700 and make sure nobody else owns or can write it
+    # (someone could have made it first in a shared temp dir). None if not.
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.lstat(path)
+    except OSError as e:
+        cache_log.warning("Disk cache disabled, cannot create %s: %s", path, e)
+        return None
+    own = not hasattr(os, "getuid") or info.st_uid == os.getuid()
+    if not stat.S_ISDIR(info.st_mode) or not own or info.st_mode & 0o077:
+        cache_log.warning("Disk cache disabled: %s is not a private directory owned by this user", path)
+        return None
+    return path
+
+# Bump when the response payload (or how samples or synthetic data are drawn) changes so stale
+# cached payloads aren't served
+RESULT_SCHEMA_VERSION = 8
+
+MODEL_CONFIGS = {
+    "biased": {"estimator": "DecisionTreeClassifier", "max_depth": 5},
+    "mitigated": {"estimator": "DecisionTreeClassifier", "max_depth": 5, "constraints": "DemographicParity"},
+}
+MODEL_CONFIGS["audit"] = {"baseline": MODEL_CONFIGS["biased"], "mitigated": MODEL_CONFIGS["mitigated"]}
+
+def _json_default(value):
+    # NumPy scalars and arrays left in a payload
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class ResultCache:
+    def __init__(self, maxsize, cache_dir=None, disk_entries=RESULT_CACHE_DISK_ENTRIES):
+        self.maxsize = maxsize
+        self.cache_dir = private_dir(cache_dir) if cache_dir else None
+        self.disk_entries = disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+    @staticmethod
+    def key(**parts):
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        # Returns (entry, tier); tier is None on a miss. Disk hits carry
+        # metrics only (the model lives in the artifact store).
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits["memory"] += 1
+                return self._entries[key], "memory"
+        entry = self._read(key) if self.cache_dir else None
+        if entry is not None:
+            with self._lock:
+                self.hits["disk"] += 1
+                self._remember(key, entry)
+            return entry, "disk"
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def _read(self, key):
+        try:
+            with open(self._path(key)) as f:
+                entry = {"metrics": json.load(f), "model": None}
+            os.utime(self._path(key))  # recently used, evicted last
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Half-written or corrupt: drop it and refit
+            with suppress(OSError):
+                os.remove(self._path(key))
+            return None
+
+    def put(self, key, entry):
+        with self._lock:
+            self._remember(key, entry)
+        if self.cache_dir:
+            # Write-then-rename so concurrent readers never see half a file
+            tmp_path = f"{self._path(key)}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entry["metrics"], f, default=_json_default)
+            os.replace(tmp_path, self._path(key))
+            self._evict_disk()
+
+    def _evict_disk(self):
+        # Least recently written or read files go first
+        try:
+            files = [item for item in os.scandir(self.cache_dir) if item.name.endswith(".json")]
+        except OSError:
+            return
+        if len(files) <= self.disk_entries:
+            return
+        files.sort(key=lambda item: item.stat().st_mtime)
+        for item in files[:len(files) - self.disk_entries]:
+            with suppress(OSError):
+                os.remove(item.path)
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits["memory"] + self.hits["disk"] + self.misses
+        return {
+            "hits_memory": self.hits["memory"],
+            "hits_disk": self.hits["disk"],
+            "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups, 3) if lookups else None,
+            "entries_memory": len(self._entries),
+        }
+
+results = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_DIR)
+
+def result_key(kind, req):
+    return ResultCache.key(
+        kind=kind, dataset=req.dataset_id or "synthetic",
+        n_samples=req.n_samples, seed=req.seed, config=MODEL_CONFIGS[kind],
+        bootstrap=req.bootstrap, ci_level=req.ci_level, schema=RESULT_SCHEMA_VERSION,
+        sensitive_columns=req.sensitive_columns, min_support=req.min_support,
+        fast=req.fast and {"tol": req.tol, "coarse_fraction": req.coarse_fraction},
+    )
+
+def cache_result(key, result):
+    # Split a fresh fit into the public payload and the model, and keep both
+    result = dict(result)
+    model = result.pop("model")
+    results.put(key, {"metrics": result, "model": model})
+    return {**result, "cache": "miss"}
+
+def cached_payload(entry, tier):
+    return {**entry["metrics"], "cache": f"hit-{tier}"}
+
+# --- TRAINING JOBS ---
+# Heavy mitigations run in a bounded process pool. Workers report progress
+# (reduction iteration) through a shared Manager dict, and check it for
+# cancel/timeout flags between iterations.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+JOB_TIMEOUT_S = float(os.environ.get("JOB_TIMEOUT_S", 600))
+JOB_HISTORY = int(os.environ.get("JOB_HISTORY", 200))
+JOB_POLL_INTERVAL_S = 0.5
+JOB_FINISH_WORKERS = int(os.environ.get("JOB_FINISH_WORKERS", 2))  # threads saving finished jobs' models and cache entries
+FINAL_JOB_STATES = ("done", "failed", "cancelled", "timeout")
+
+class JobRequest(TrainRequest):
+    timeout_s: Optional[float] = None
+
+class JobStopped(Exception):
+    pass
+
+# Worker-side state for the job currently running in this process
+_active_job = None
+
+def _oracle_checkpoint():
+    # Called once per oracle fit, i.e. once per ExponentiatedGradient iteration
+    job = _active_job
+    if job is None:
+        return
+    if job["cancel_flags"].get(job["job_id"]):
+        raise JobStopped("cancelled")
+    if time.time() > job["deadline"]:
+        raise JobStopped("timeout")
+    job["iteration"] += 1
+    job["progress"][job["job_id"]] = (job["iteration"], job["started_at"])
+
+# fairlearn's reductions validate X as dense, but never look inside it: they
+# only hand it to the base estimator. For sparse features we give them a
+# column of row ids and let the tree swap in the matching sparse rows.
+_row_source = None
+
+def _resolve_rows(X):
+    if _row_source is None:
+        return X
+    return _row_source[np.asarray(X, dtype=np.int64).ravel()]
+
+_progress_tree_lock = threading.Lock()
+
+def progress_tree_class():
+    # Subclassing needs sklearn, so the class is built on first use. It is
+    # published as main.ProgressTree so pickled models still resolve.
+    with _progress_tree_lock:
+        if "ProgressTree" not in globals():
+            class ProgressTree(sklearn_tree.DecisionTreeClassifier):
+                # ExponentiatedGradient clones and refits its base estimator on every
+                # iteration, so counting fits tracks the reduction's progress.
+                def fit(self, X, y, sample_weight=None, check_input=True):
+                    _oracle_checkpoint()
+                    return super().fit(_resolve_rows(X), y, sample_weight=sample_weight, check_input=check_input)
+
+                def predict(self, X, check_input=True):
+                    return super().predict(_resolve_rows(X), check_input=check_input)
+
+            ProgressTree.__qualname__ = "ProgressTree"
+            globals()["ProgressTree"] = ProgressTree
+        return globals()["ProgressTree"]
+
+def __getattr__(name):
+    # Module-level hook (PEP 562): unpickling looks up main.ProgressTree
+    if name == "ProgressTree":
+        return progress_tree_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def fit_reduction(X_train, y_train, s_train, X_test, constraints, max_depth=5, seed=None, fast=None):
+    # ExponentiatedGradient fit + test predictions, for dense or CSR features.
+    # fast holds fast_fit's options (tol, coarse_fraction, warm).
+    global _row_source
+    mitigator = fairlearn_reductions.ExponentiatedGradient(
+        estimator=progress_tree_class()(max_depth=max_depth, random_state=seed),
+        constraints=constraints,
+    )
+
+    def fit(X):
+        if fast is None:
+            mitigator.fit(X, y_train, sensitive_features=s_train)
+        else:
+            fast_fit(mitigator, X, y_train, s_train, seed=seed, **fast)
+
+    if not sparse.issparse(X_train):
+        fit(X_train)
+        return mitigator, mitigator.predict(X_test, random_state=seed)
+
+    n_train = X_train.shape[0]
+    _row_source = sparse.vstack([X_train, X_test], format="csr")
+    try:
+        fit(np.arange(n_train)[:, None])
+        y_pred = mitigator.predict(n_train + np.arange(X_test.shape[0])[:, None], random_state=seed)
+    finally:
+        _row_source = None
+    return mitigator, y_pred
+
+def _run_job(job_id, progress, cancel_flags, deadline, fn, args):
+    global _active_job
+    _active_job = {
+        "job_id": job_id, "progress": progress, "cancel_flags": cancel_flags,
+        "deadline": deadline, "iteration": -1, "started_at": time.time(),
+    }
+    try:
+        # Marks the job as running; the deadline may have passed in the queue
+        _oracle_checkpoint()
+        result = fn(*args)
+        return {**result, "iterations": _active_job["iteration"]}
+    finally:
+        _active_job = None
+
+def record_job_stages(kind, result):
+    # Pool workers have their own (throwaway) metrics, so their stage
+    # timings travel back with the result and are recorded here
+    if "timings" in result:
+        stage_metrics.observe("fit_mitigated", result["timings"]["fit_s"])
+        stage_metrics.observe("metrics", result["timings"]["metrics_s"])
+    elif "fit_s" in result:
+        stage_metrics.observe(f"fit_{kind}", result["fit_s"])
+
+class JobManager:
+    def __init__(self, workers, history):
+        self.workers = workers
+        self.history = history
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._manager = None
+        self._finisher = None
+
+    def _start(self):
+        # Pool and Manager are created on first use, not at import time
+        if self._executor is None:
+            # Start the resource tracker first so workers inherit it instead of
+            # spawning their own (which would "clean up" shared sweep blocks)
+            multiprocessing.resource_tracker.ensure_running()
+            self._manager = multiprocessing.Manager()
+            self._progress = self._manager.dict()
+            self._cancel_flags = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            # on_result does disk I/O; running it in the pool's completion
+            # thread would queue every other job's result behind it
+            self._finisher = ThreadPoolExecutor(max_workers=JOB_FINISH_WORKERS, thread_name_prefix="job-finish")
+
+    def submit(self, kind, fn, *args, timeout=None, on_result=None):
+        # on_result runs in this process on success, e.g. to cache the model
+        job_id = uuid.uuid4().hex[:12]
+        submitted_at = time.time()
+        with self._lock:
+            self._start()
+            deadline = submitted_at + (timeout or JOB_TIMEOUT_S)
+            future = self._executor.submit(_run_job, job_id, self._progress, self._cancel_flags, deadline, fn, args)
+            self._jobs[job_id] = {
+                "kind": kind, "future": future, "on_result": on_result,
+                "submitted_at": submitted_at, "finished_at": None,
+            }
+            self._trim()
+        finisher = self._finisher
+        future.add_done_callback(lambda _: self._schedule_finish(finisher, job_id))
+        return job_id
+
+    def _schedule_finish(self, finisher, job_id):
+        # A job still running at shutdown ends after the finisher is closed;
+        # its outcome is then recorded right here
+        try:
+            finisher.submit(self._finish, job_id)
+        except RuntimeError:
+            self._finish(job_id)
+
+    def add_finished(self, kind, result):
+        # Record an already-known result (e.g. a cache hit) as a finished job
+        job_id = uuid.uuid4().hex[:12]
+        future = Future()
+        future.set_result(result)
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = {
+                "kind": kind, "future": future, "on_result": None, "submitted_at": now,
+                "finished_at": now, "status": "done", "result": result,
+            }
+            self._trim()
+        return job_id
+
+    def _finish(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            future = job["future"]
+            if future.cancelled():
+                job["status"] = "cancelled"
+            elif isinstance(future.exception(), JobStopped):
+                job["status"] = str(future.exception())
+            elif future.exception() is not None:
+                job["status"] = "failed"
+                job["error"] = f"{type(future.exception()).__name__}: {future.exception()}"
+            else:
+                try:
+                    result = future.result()
+                    record_job_stages(job["kind"], result)
+                    job["result"] = job["on_result"](result) if job["on_result"] else result
+                    job["status"] = "done"
+                except Exception as e:
+                    job["status"] = "failed"
+                    job["error"] = f"{type(e).__name__}: {e}"
+            job["finished_at"] = time.time()
+        if self._executor is not None:
+            self._progress.pop(job_id, None)
+            self._cancel_flags.pop(job_id, None)
+
+    def _trim(self):
+        # Forget the oldest finished jobs beyond the history limit
+        finished = [job_id for job_id, job in self._jobs.items() if job["finished_at"] is not None]
+        for job_id in finished[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+
+    def _get(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown job_id '{job_id}'")
+        return job
+
+    def status(self, job_id):
+        job = self._get(job_id)
+        info = {"job_id": job_id, "kind": job["kind"], "iteration": None, "elapsed_s": None}
+
+        if job["finished_at"] is not None:
+            info["status"] = job["status"]
+            info["elapsed_s"] = round(job["finished_at"] - job["submitted_at"], 2)
+            if "result" in job:
+                info["result"] = job["result"]
+                info["iteration"] = job["result"].get("iterations")
+            if "error" in job:
+                info["error"] = job["error"]
+        else:
+            running = self._progress.get(job_id)
+            info["status"] = "running" if running else "queued"
+            if running:
+                info["iteration"], started_at = running
+                info["elapsed_s"] = round(time.time() - started_at, 2)
+        return info
+
+    def cancel(self, job_id):
+        job = self._get(job_id)
+        # Queued jobs are dropped outright; running ones stop at the next iteration
+        if job["finished_at"] is None and not job["future"].cancel():
+            self._cancel_flags[job_id] = True
+        return self.status(job_id)
+
+    def counts(self):
+        with self._lock:
+            states = [job["status"] if job["finished_at"] is not None else "pending" for job in self._jobs.values()]
+        return {state: states.count(state) for state in sorted(set(states))}
+
+    def shutdown(self):
+        if self._executor is not None:
+            # Cleared first, so late _finish calls skip the Manager's dicts
+            executor, finisher, manager = self._executor, self._finisher, self._manager
+            self._executor = self._manager = self._finisher = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            finisher.shutdown(wait=False, cancel_futures=True)
+            manager.shutdown()
+
+    async def wait(self, job_id):
+        job = self._get(job_id)
+        await asyncio.wrap_future(job["future"])
+        # The done callback may still be post-processing the result
+        while job["finished_at"] is None:
+            await asyncio.sleep(0.01)
+        return self.status(job_id)
+
+jobs = JobManager(JOB_WORKERS, JOB_HISTORY)
+
+def split_data(X, y, sex, seed=None):
+    # One split shared by every model that's compared against each other
+    with stage("split"):
+        return sklearn_model_selection.train_test_split(X, y, sex, test_size=0.3, random_state=seed)
+
+def fit_biased(split, seed=None, bootstrap=0, ci_level=0.95, groups=None):
+    X_train, X_test, y_train, y_test, s_train, s_test = split
+    
+    with stage("fit_biased") as fit:
+        model = sklearn_tree.DecisionTreeClassifier(max_depth=5, random_state=seed)
+        model.fit(X_train, y_train)
+        y_pred = model.predict(X_test)
+
+    with stage("metrics") as metrics:
+        payload = summarize_predictions(y_test, y_pred, s_test, bootstrap, ci_level, seed, groups)
+    timings = {"fit_s": round(fit.seconds, 4), "metrics_s": round(metrics.seconds, 4)}
+    return {**payload, "timings": timings, "model": model}
+
+def fit_mitigated(split, seed=None, bootstrap=0, ci_level=0.95, groups=None, fast=None):
+    X_train, X_test, y_train, y_test, s_train, s_test = split
+    
+    started = time.perf_counter()
+    mitigator, y_pred = fit_reduction(X_train, y_train, s_train, X_test, fairlearn_reductions.DemographicParity(), max_depth=5, seed=seed, fast=fast)
+    fitted = time.perf_counter()
+
+    payload = summarize_predictions(y_test, y_pred, s_test, bootstrap, ci_level, seed, groups)
+    timings = {"fit_s": round(fitted - started, 4), "metrics_s": round(time.perf_counter() - fitted, 4)}
+    reduction = {**reduction_report(mitigator), "train_rows": X_train.shape[0]}
+    return {**payload, "timings": timings, "reduction": reduction, "warm_state": warm_state(mitigator), "model": mitigator}
+
+def run_biased(X, y, sex, seed=None, bootstrap=0, ci_level=0.95, groups=None):
+    return fit_biased(split_data(X, y, sex, seed), seed, bootstrap, ci_level, groups)
+
+def run_mitigated(X, y, sex, seed=None, bootstrap=0, ci_level=0.95, groups=None, fast=None):
+    return fit_mitigated(split_data(X, y, sex, seed), seed, bootstrap, ci_level, groups, fast)
+
+# --- FAST MITIGATION ---
+# A cold ExponentiatedGradient run starts from zero multipliers and an empty
+# set of oracle fits every time. Fast mode runs the same loop (mirrored from
+# fairlearn, on its _Lagrangian), but starts from the multipliers and best
+# trees of the last run on the same dataset, may first solve on a subsample,
+# and stops as soon as the constraint violation and the Lagrangian settle.
+FAST_MIN_ITER = 2  # fairlearn waits 5 iterations before testing convergence; warm starts need fewer
+# The fairlearn internals warm_loop drives (tested on fairlearn 0.15)
+FAST_INTERNALS = {
+    "lagrangian": ("_Lagrangian", "_PredictorAsCallable"),
+    "_Lagrangian": ("best_h", "_eval", "solve_linprog"),
+    "constants": ("_ACCURACY_MUL", "_MIN_ITER", "_REGRET_CHECK_START_T", "_REGRET_CHECK_INCREASE_T", "_SHRINK_REGRET", "_SHRINK_ETA"),
+}
+fast_log = logging.getLogger("auditor.fast")
+_fast_supported = None
+COARSE_MIN_ROWS = 500
+WARM_START_PREDICTORS = int(os.environ.get("WARM_START_PREDICTORS", 16))
+WARM_START_KEEP = int(os.environ.get("WARM_START_KEEP", 32))
+
+def _take_rows(data, rows):
+    return data.iloc[rows] if hasattr(data, "iloc") else data[rows]
+
+def seed_hypotheses(lagrangian, predictors):
+    # Score earlier oracle fits on this data and add them as candidates that
+    # best_h can pick instead of a fresh fit. False if they don't fit X.
+    scored = []
+    try:
+        for classifier in predictors:
+            h = fairlearn_lagrangian._PredictorAsCallable(classifier)
+            scored.append((h, classifier, lagrangian.obj.gamma(h).iloc[0], lagrangian.constraints.gamma(h)))
+    except ValueError:
+        return False
+    for h, classifier, error, gamma in scored:
+        h_idx = len(lagrangian.hs)
+        lagrangian.hs.at[h_idx] = h
+        lagrangian.predictors.at[h_idx] = classifier
+        lagrangian.errors.at[h_idx] = error
+        lagrangian.gammas[h_idx] = gamma
+        lagrangian.lambdas[h_idx] = pd.Series(0.0, lagrangian.constraints.index)
+    return bool(scored)
+
+def mixture_lp(lagrangian):
+    # fairlearn's LP step, primal only: the mixture of the fits so far with
+    # the lowest error + B * worst violation, and that objective
+    bound = lagrangian.constraints.bound()
+    c = np.concatenate((lagrangian.errors, [lagrangian.B]))
+    A_ub = np.concatenate((lagrangian.gammas.sub(bound, axis=0), -np.ones((len(bound), 1))), axis=1)
+    A_eq = np.concatenate((np.ones((1, len(lagrangian.hs))), np.zeros((1, 1))), axis=1)
+    result = scipy_optimize.linprog(c, A_ub=A_ub, b_ub=np.zeros(len(bound)), A_eq=A_eq, b_eq=np.ones(1), method="highs-ds")
+    return pd.Series(result.x[:-1], lagrangian.hs.index), result.fun
+
+def warm_loop(mitigator, X, y, s, tol, warm=None):
+    # ExponentiatedGradient.fit with a warm start and a cheaper stopping rule.
+    # fairlearn certifies the duality gap every iteration, which costs up to
+    # eight extra oracle fits; here the LP mixture's objective and constraint
+    # violation (no fits needed) decide when to stop, and the gap is
+    # certified once at the end.
+    C = fairlearn_eg_constants
+    B = 1 / mitigator.eps
+    lagrangian = fairlearn_lagrangian._Lagrangian(
+        X=X, y=y, estimator=mitigator.estimator, constraints=mitigator.constraints, B=B,
+        objective=mitigator.objective, sample_weight_name=mitigator.sample_weight_name, sensitive_features=s,
+    )
+    index = lagrangian.constraints.index
+    bound = lagrangian.constraints.bound()
+    warm_started = warm is not None and seed_hypotheses(lagrangian, warm["predictors"])
+    # Groups missing from the earlier run start neutral
+    theta = warm["theta"].reindex(index, fill_value=0.0) if warm_started else pd.Series(0.0, index)
+    min_iter = FAST_MIN_ITER if warm_started else C._MIN_ITER
+
+    Qsum = pd.Series(dtype="float64")
+    lambda_vecs_EG, gaps_upper = {}, []
+    last_regret_checked, last_gap = C._REGRET_CHECK_START_T, np.inf
+    lambda_cumsum = pd.Series(0.0, index)
+    previous_objective, stop_reason = np.inf, "max_iter"
+    for t in range(mitigator.max_iter):
+        lambda_vec = B * np.exp(theta) / (1 + np.exp(theta).sum())
+        lambda_vecs_EG[t] = lambda_vec
+        lambda_cumsum += lambda_vec
+        h, h_idx = lagrangian.best_h(lambda_vec)
+        if t == 0:
+            nu = C._ACCURACY_MUL * (h(X) - lagrangian.constraints._y_as_series).abs().std() / np.sqrt(lagrangian.constraints.total_samples)
+            eta = mitigator.eta0 / B
+
+        Qsum.at[h_idx] = Qsum.get(h_idx, 0.0) + 1.0
+        gamma = lagrangian.gammas[h_idx]
+        Q_LP, objective = mixture_lp(lagrangian)
+        violation = max(float((lagrangian.gammas[Q_LP.index].dot(Q_LP) - bound).max()), 0.0)
+        if t >= min_iter and violation <= tol and previous_objective - objective <= tol:
+            stop_reason = "tolerance"
+            break
+        previous_objective = objective
+
+        # fairlearn's step-size schedule, on the (free) upper half of the EG gap
+        L, L_high, _, _ = lagrangian._eval(Qsum / Qsum.sum(), lambda_cumsum / (t + 1))
+        gaps_upper.append(L_high - L)
+        if t >= last_regret_checked * C._REGRET_CHECK_INCREASE_T:
+            best_gap = min(gaps_upper)
+            if best_gap > last_gap * C._SHRINK_REGRET:
+                eta *= C._SHRINK_ETA
+            last_regret_checked, last_gap = t, best_gap
+        theta += eta * (gamma - bound)
+
+    # Certify the final mixture once (the LP step again, with its dual)
+    lambda_vecs_LP = {}
+    Q, lambda_vecs_LP[t], result = lagrangian.solve_linprog(nu)
+
+    # Same fitted attributes as ExponentiatedGradient.fit, so predict,
+    # pickling and model_tables don't see a difference
+    mitigator.best_iter_ = mitigator.last_iter_ = t
+    mitigator.best_gap_ = result.gap()
+    mitigator.weights_ = Q.reindex(lagrangian.hs.index, fill_value=0.0)
+    mitigator._hs = lagrangian.hs
+    mitigator.predictors_ = lagrangian.predictors
+    mitigator.constraints_ = lagrangian.constraints
+    mitigator.n_oracle_calls_ = lagrangian.n_oracle_calls
+    mitigator.n_oracle_calls_dummy_returned_ = lagrangian.n_oracle_calls_dummy_returned
+    mitigator.oracle_execution_times_ = lagrangian.oracle_execution_times
+    mitigator.lambda_vecs_EG_ = pd.DataFrame(lambda_vecs_EG)
+    mitigator.lambda_vecs_LP_ = pd.DataFrame(lambda_vecs_LP)
+    mitigator.lambda_vecs_ = lagrangian.lambdas.copy()
+    mitigator.theta_ = theta
+    mitigator.warm_started_ = warm_started
+    mitigator.stop_reason_ = stop_reason
+    return mitigator
+
+def fast_supported():
+    # Whether this fairlearn still has the internals warm_loop mirrors;
+    # checked once per process
+    global _fast_supported
+
+    def has(module, name):
+        try:
+            return hasattr(module, name)
+        except ImportError:  # a lazy module tries name as a submodule
+            return False
+
+    if _fast_supported is None:
+        try:
+            lagrangian = fairlearn_lagrangian._Lagrangian if has(fairlearn_lagrangian, "_Lagrangian") else None
+            missing = [name for name in FAST_INTERNALS["lagrangian"] if not has(fairlearn_lagrangian, name)]
+            missing += [f"_Lagrangian.{name}" for name in FAST_INTERNALS["_Lagrangian"] if not hasattr(lagrangian, name)]
+            missing += [name for name in FAST_INTERNALS["constants"] if not has(fairlearn_eg_constants, name)]
+        except ImportError as e:  # the modules themselves moved
+            missing = [str(e)]
+        if missing:
+            fast_log.warning("fairlearn internals missing (%s), fast mitigation runs stock fits", ", ".join(missing))
+        _fast_supported = not missing
+    return _fast_supported
+
+def fast_fit(mitigator, X, y, s, tol=FAST_TOL, coarse_fraction=None, warm=None, seed=None):
+    if not fast_supported():
+        # Another fairlearn release: a stock (cold) fit, reported as such
+        mitigator.fit(X, y, sensitive_features=s)
+        return mitigator
+    # Coarse-to-fine: a pass on a subsample warm-starts the full-data pass
+    n_rows, coarse_iters = X.shape[0], 0
+    if coarse_fraction is not None and n_rows * coarse_fraction >= COARSE_MIN_ROWS:
+        rows = np.sort(np.random.default_rng(seed).choice(n_rows, int(n_rows * coarse_fraction), replace=False))
+        coarse = warm_loop(type(mitigator)(**mitigator.get_params(deep=False)), _take_rows(X, rows), _take_rows(y, rows), _take_rows(s, rows), tol, warm)
+        warm, coarse_iters = warm_state(coarse), coarse.last_iter_ + 1
+    warm_loop(mitigator, X, y, s, tol, warm)
+    if coarse_iters:
+        # Seeded by the coarse pass either way; report whether an earlier run was reused
+        mitigator.warm_started_ = coarse.warm_started_
+    mitigator.coarse_iters_ = coarse_iters
+    return mitigator
+
+def warm_state(mitigator):
+    # What the next fast run on this data starts from: the final multipliers
+    # (as theta) and the heaviest-weighted oracle fits
+    theta = getattr(mitigator, "theta_", None)
+    if theta is None:
+        # A stock fit keeps lambda = B*exp(theta) / (1 + sum(exp(theta))) only
+        lambda_vec, B = mitigator.lambda_vecs_EG_.iloc[:, -1], 1 / mitigator.eps
+        theta = np.log(np.maximum(lambda_vec, 1e-300)) - np.log(max(B - lambda_vec.sum(), 1e-300))
+    weights = mitigator.weights_[mitigator.predictors_.index]
+    keep = weights[weights > 0].sort_values(ascending=False).index[:WARM_START_PREDICTORS]
+    return {"theta": theta, "predictors": list(mitigator.predictors_[keep])}
+
+def reduction_report(mitigator):
+    iterations = int(mitigator.last_iter_) + 1
+    return {
+        "mode": "fast" if hasattr(mitigator, "stop_reason_") else "cold",
+        "iterations": iterations,
+        "oracle_calls": int(mitigator.n_oracle_calls_),
+        "best_gap": round(float(mitigator.best_gap_), 6),
+        "warm_start": bool(getattr(mitigator, "warm_started_", False)),
+        "coarse_iterations": int(getattr(mitigator, "coarse_iters_", 0)),
+        "stopped": getattr(mitigator, "stop_reason_", "max_iter" if iterations >= mitigator.max_iter else "converged"),
+    }
+
+class WarmStarts:
+    # Per dataset: the latest reduction state (handed to the next fast run)
+    # and the latest cold fit's seconds per training row (what fast runs are
+    # priced against). Lives in the API process; each job gets a copy.
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def state(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry and entry["state"]
+
+    def record(self, key, state, reduction, fit_s):
+        # Returns the estimated cold fit time for this run's training rows,
+        # or None before any cold run on the dataset
+        with self._lock:
+            entry = self._entries.setdefault(key, {"cold_s_per_row": None})
+            entry["state"] = state
+            if reduction["mode"] == "cold":
+                entry["cold_s_per_row"] = fit_s / max(reduction["train_rows"], 1)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            per_row = entry["cold_s_per_row"]
+        return None if per_row is None else per_row * reduction["train_rows"]
+
+warm_starts = WarmStarts(WARM_START_KEEP)
+
+def fast_options(req):
+    # fast_fit's options for a request, or None for a cold run
+    if not req.fast:
+        return None
+    return {"tol": req.tol, "coarse_fraction": req.coarse_fraction, "warm": warm_starts.state(req.dataset_id or "synthetic")}
+
+def finish_reduction(req, result):
+    # Keep the run's state for the next fast run, and price it against a cold fit
+    result = dict(result)
+    fit_s = result["timings"]["fit_s"]
+    cold_s = warm_starts.record(req.dataset_id or "synthetic", result.pop("warm_state"), result["reduction"], fit_s)
+    result["reduction"] = {
+        **result["reduction"],
+        "cold_fit_s": None if cold_s is None else round(cold_s, 4),
+        "time_saved_s": None if cold_s is None else round(cold_s - fit_s, 4),
+    }
+    return result
+
+# --- MODEL ARTIFACTS ---
+# Fitted models are saved as a flat node table (one .npy per field, every
+# tree of an ensemble concatenated) under ARTIFACT_DIR/<name>/v<N>/, next to
+# a meta.json holding the feature encoder. Loading memory-maps the arrays;
+# scoring walks all trees for a whole chunk of rows at once in NumPy.
+ARTIFACT_DIR = os.environ.get("ARTIFACT_DIR", os.path.join(tempfile.gettempdir(), "algorithmic-auditor", "artifacts"))
+ARTIFACT_KEEP_VERSIONS = int(os.environ.get("ARTIFACT_KEEP_VERSIONS", 5))
+MODEL_CACHE_SIZE = int(os.environ.get("MODEL_CACHE_SIZE", 8))
+NODE_FIELDS = ("left", "right", "feature", "threshold", "leaf_value")
+
+def tree_table(estimator):
+    # Node arrays of one predictor, plus its depth
+    if hasattr(estimator, "tree_"):
+        tree = estimator.tree_
+        leaf_value = estimator.classes_[np.argmax(tree.value[:, 0, :], axis=1)]
+        return (tree.children_left, tree.children_right, tree.feature, tree.threshold, leaf_value), tree.max_depth
+    # fairlearn swaps in a constant DummyClassifier when the reweighted labels
+    # are all equal: a tree with a single leaf
+    return ([-1], [-1], [-2], [-2.0], [estimator.constant]), 0
+
+def model_tables(model):
+    # A plain tree is an ensemble of one with weight 1. Zero-weight
+    # predictors of an ExponentiatedGradient never vote, so they're dropped.
+    if hasattr(model, "predictors_"):
+        weights = model.weights_[model.predictors_.index].to_numpy(dtype=np.float64)
+        predictors = [est for est, weight in zip(model.predictors_, weights) if weight > 0]
+        weights = weights[weights > 0]
+    else:
+        predictors, weights = [model], np.ones(1)
+
+    fields = {field: [] for field in NODE_FIELDS}
+    roots, offset, depth = [], 0, 0
+    for estimator in predictors:
+        (left, right, feature, threshold, leaf_value), tree_depth = tree_table(estimator)
+        left, right = np.asarray(left, dtype=np.int64), np.asarray(right, dtype=np.int64)
+        fields["left"].append(np.where(left >= 0, left + offset, -1))
+        fields["right"].append(np.where(right >= 0, right + offset, -1))
+        fields["feature"].append(np.asarray(feature, dtype=np.int64))
+        fields["threshold"].append(np.asarray(threshold, dtype=np.float64))
+        fields["leaf_value"].append(np.asarray(leaf_value, dtype=np.float64))
+        roots.append(offset)
+        offset += len(left)
+        depth = max(depth, tree_depth)
+
+    tables = {field: np.concatenate(values) for field, values in fields.items()}
+    return {**tables, "roots": np.array(roots, dtype=np.int64), "weights": weights}, depth
+
+class TreeEnsemble:
+    # A loaded artifact: memory-mapped node table plus what scoring needs
+    def __init__(self, name, version, meta, arrays):
+        self.name = name
+        self.version = version
+        self.meta = meta
+        self.encoder = meta["encoder"]
+        self.arrays = arrays
+        # Only features some split uses get densified at predict time
+        internal = arrays["left"] >= 0
+        self.used_features = np.unique(arrays["feature"][internal])
+        # Leaves point back at themselves (test always fails, both children
+        # are the leaf), so every level is the same branch-free step
+        leaf = np.flatnonzero(~internal)
+        self.column = np.zeros(len(internal), dtype=np.int64)
+        self.column[internal] = np.searchsorted(self.used_features, arrays["feature"][internal])
+        self.threshold = np.where(internal, arrays["threshold"], -np.inf)
+        self.left = np.array(arrays["left"])
+        self.right = np.array(arrays["right"])
+        self.left[leaf] = self.right[leaf] = leaf
+
+    def score(self, X):
+        # P(prediction = 1) per row: every tree advances one level per step
+        # for all rows, then leaf votes are weighted like fairlearn's _pmf_predict
+        n = X.shape[0]
+        values = X[:, self.used_features].toarray() if sparse.issparse(X) else np.asarray(X)[:, self.used_features]
+        values = values.astype(np.float64).ravel()
+        if not len(self.used_features):
+            values = np.zeros(n)  # only constant predictors: nothing to look up
+        nodes = np.tile(self.arrays["roots"], (n, 1))
+        row_offset = (np.arange(n) * max(len(self.used_features), 1))[:, None]
+        for _ in range(self.meta["depth"]):
+            # NaN features fail every "<=" test and follow the right branch
+            go_left = np.take(values, row_offset + np.take(self.column, nodes)) <= np.take(self.threshold, nodes)
+            nodes = np.where(go_left, np.take(self.left, nodes), np.take(self.right, nodes))
+        return np.take(self.arrays["leaf_value"], nodes) @ self.arrays["weights"]
+
+    def predict(self, scores, random_state):
+        # Same draw as ExponentiatedGradient.predict(random_state=seed);
+        # a single tree's score is already its 0/1 label
+        if self.meta["randomized"]:
+            return (scores >= random_state.rand(len(scores))).astype(np.int64)
+        return (scores >= 0.5).astype(np.int64)
+
+class ArtifactStore:
+    def __init__(self, root, keep_versions=5, cache_size=8):
+        self.root = root
+        self.keep_versions = keep_versions
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._loaded = OrderedDict()
+
+    def _path(self, name, version=None):
+        path = os.path.join(self.root, name)
+        return path if version is None else os.path.join(path, f"v{version}")
+
+    def versions(self, name):
+        try:
+            entries = os.listdir(self._path(name))
+        except FileNotFoundError:
+            return []
+        return sorted(int(entry[1:]) for entry in entries if entry[:1] == "v" and entry[1:].isdigit())
+
+    def save(self, name, model, encoder, info):
+        tables, depth = model_tables(model)
+        os.makedirs(self._path(name), exist_ok=True)
+        # Write into a staging dir and rename it in, so readers never see a
+        # half-written version
+        staging = os.path.join(self._path(name), f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(staging)
+        for field, values in tables.items():
+            np.save(os.path.join(staging, f"{field}.npy"), values)
+        meta = {
+            "estimator": type(model).__name__,
+            "randomized": hasattr(model, "predictors_"),
+            "trees": len(tables["roots"]),
+            "depth": int(depth),
+            "encoder": encoder,
+            "created_at": time.time(),
+            **info,
+        }
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        with self._lock:
+            version = max(self.versions(name), default=0) + 1
+            for _ in range(5):
+                try:
+                    os.rename(staging, self._path(name, version))
+                    break
+                except OSError:  # another API process took this version number
+                    version += 1
+            self._prune(name)
+        return {"name": name, "version": version}
+
+    def _prune(self, name):
+        for version in self.versions(name)[:-self.keep_versions]:
+            path = self._path(name, version)
+            for entry in os.listdir(path):
+                os.remove(os.path.join(path, entry))
+            os.rmdir(path)
+            self._loaded.pop((name, version), None)
+
+    def load(self, name, version=None):
+        # KeyError for unknown names/versions; loaded models are LRU-cached
+        versions = self.versions(name)
+        if not versions or (version is not None and version not in versions):
+            raise KeyError(f"{name} v{version}" if version is not None else name)
+        version = versions[-1] if version is None else version
+        with self._lock:
+            if (name, version) in self._loaded:
+                self._loaded.move_to_end((name, version))
+                return self._loaded[(name, version)]
+
+        path = self._path(name, version)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {field: np.load(os.path.join(path, f"{field}.npy"), mmap_mode="r") for field in (*NODE_FIELDS, "roots", "weights")}
+        ensemble = TreeEnsemble(name, version, meta, arrays)
+        with self._lock:
+            self._loaded[(name, version)] = ensemble
+            while len(self._loaded) > self.cache_size:
+                self._loaded.popitem(last=False)
+        return ensemble
+
+    def summary(self):
+        names = sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+        return [{"name": name, "versions": self.versions(name)} for name in names if self.versions(name)]
+
+artifacts = ArtifactStore(ARTIFACT_DIR, ARTIFACT_KEEP_VERSIONS, MODEL_CACHE_SIZE)
+SYNTHETIC_ENCODER = fit_encoder(dict.fromkeys(SYNTHETIC_FEATURES), {})
+
+def training_encoder(req):
+    # The encoding a model trained for this request expects at predict time
+    if req.dataset_id is None:
+        return SYNTHETIC_ENCODER
+    entry = registry.get(req.dataset_id)
+    return None if entry is None else entry["dataset"].encoder
+
+def save_artifact(kind, req, model, encoder):
+    name = f"{kind}-{req.dataset_id or 'synthetic'}"
+    return artifacts.save(name, model, encoder, {"kind": kind, "dataset_id": req.dataset_id, "n_samples": req.n_samples, "seed": req.seed})
+
+def finish_training(kind, key, req, encoder, result):
+    # Fresh fit: persist the model for /predict, then cache the payload
+    return cache_result(key, {**result, "artifact": save_artifact(kind, req, result["model"], encoder)})
+
+def prediction_frames(raw, text_columns):
+    # DataFrame chunks from an uploaded CSV (optionally gzip/zstd) or Arrow
+    # IPC file/stream, never the whole batch at once
+    head = raw.read(8)
+    raw.seek(0)
+    if head.startswith(b"ARROW1") or head.startswith(b"\xff\xff\xff\xff"):
+        if pa is None:
+            raise ValueError("Arrow input needs pyarrow installed")
+        if head.startswith(b"ARROW1"):
+            reader = pa.ipc.open_file(raw)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        else:
+            batches = pa.ipc.open_stream(raw)
+        for batch in batches:
+            for start in range(0, batch.num_rows, INGEST_CHUNK_ROWS):
+                yield batch.slice(start, INGEST_CHUNK_ROWS).to_pandas()
+        return
+
+    stream, _ = open_csv_stream(raw)
+    # Read text features as text, so "1" stays the label seen at fit time
+    with pd.read_csv(stream, chunksize=INGEST_CHUNK_ROWS, dtype={col: str for col in text_columns}) as reader:
+        yield from reader
+
+def encode_frame(frame, encoder):
+    # Same sparse features the model was trained on; unseen labels go to
+    # the "other" column (or the hash buckets)
+    missing = [col for col in [*encoder["numeric"], *encoder["categorical"]] if col not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing feature columns: {missing}")
+    columns, categories = {}, {}
+    for col in encoder["numeric"]:
+        columns[col] = pd.to_numeric(frame[col], errors="coerce").to_numpy(dtype=np.float32)
+    for col in encoder["categorical"]:
+        values = _as_category(frame[col])
+        columns[col] = np.asarray(values.cat.codes)
+        categories[col] = [str(label) for label in values.cat.categories]
+    return encode_sparse(columns, categories, encoder)
+
+# --- STREAMING PREDICTION AUDITS ---
+# Audits of predictions made elsewhere (e.g. a production scoring log). Each
+# upload is folded chunk by chunk into per-group confusion counts, so memory
+# depends on the number of groups, not rows. Accumulators with the same
+# attributes add up, so a huge log can be audited in parallel and merged.
+STREAM_AUDIT_KEEP = int(os.environ.get("STREAM_AUDIT_KEEP", 256))
+POSITIVE_LABELS = {"1", "true", "yes", "y", "t", "positive", "approved"}
+
+class ConfusionAccumulator:
+    def __init__(self, attributes, labels=(), counts=None):
+        self.attributes = list(attributes)
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.counts = np.zeros((len(self.labels), 4), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64).reshape(len(self.labels), 4)
+
+    @property
+    def rows(self):
+        return int(self.counts.sum())
+
+    def _slots(self, labels):
+        # Rows of self.counts for these labels, adding unseen groups
+        new = [label for label in labels if label not in self.index]
+        if new:
+            self.index.update((label, len(self.labels) + i) for i, label in enumerate(new))
+            self.labels += new
+            self.counts = np.vstack([self.counts, np.zeros((len(new), 4), dtype=np.int64)])
+        return np.array([self.index[label] for label in labels], dtype=np.intp)
+
+    def update(self, y_true, y_pred, codes, labels):
+        slots = self._slots(labels)
+        self.counts[slots] += confusion_counts(y_true, y_pred, codes, len(labels))
+
+    def merge(self, other):
+        if other.attributes != self.attributes:
+            raise ValueError(f"Cannot merge audits of {other.attributes} into {self.attributes}")
+        slots = self._slots(other.labels)
+        self.counts[slots] += other.counts
+        return self
+
+    def report(self, min_support):
+        tn, fp, fn, tp = self.counts.sum(axis=0)
+        return {
+            "rows": self.rows,
+            "accuracy": float((tn + tp) / self.rows) if self.rows else None,
+            "selection_rate": float((fp + tp) / self.rows) if self.rows else None,
+            **subgroup_metrics(self.counts, self.labels, self.attributes, min_support),
+        }
+
+    def state(self):
+        return {"attributes": self.attributes, "labels": self.labels, "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state["attributes"], state["labels"], state["counts"])
+
+def binary_outcome(values, positive, threshold):
+    # 0/1 from a label or score column: numbers are thresholded, text is
+    # compared to the positive label (or a list of common ones)
+    numbers = pd.to_numeric(values, errors="coerce")
+    if not numbers.isna().any():
+        return (numbers.to_numpy() >= threshold).astype(np.int8)
+    text = values.astype(str).str.strip().str.lower()
+    if positive is not None:
+        return (text == positive.strip().lower()).to_numpy().astype(np.int8)
+    return text.isin(POSITIVE_LABELS).to_numpy().astype(np.int8)
+
+def frame_groups(frame, attributes):
+    # Chunk-local group codes; labels are stable across chunks, so
+    # accumulators can match them up (numeric ages use fixed bands)
+    parts = []
+    for name in attributes:
+        values = frame[name]
+        numbers = pd.to_numeric(values, errors="coerce")
+        if is_age_column(name) and not numbers.isna().any():
+            parts.append((name, *age_bands(numbers.to_numpy())))
+            continue
+        category = _as_category(values.astype(str))
+        parts.append((name, np.asarray(category.cat.codes), [str(label) for label in category.cat.categories]))
+    return combine_codes(parts)
+
+def accumulate_predictions(frames, y_true, y_pred, attributes, positive=None, threshold=0.5, clock=None):
+    accumulator = ConfusionAccumulator(attributes)
+    dropped = 0
+    while True:
+        started, rss = time.perf_counter(), current_rss()
+        frame = next(frames, None)
+        if clock:
+            clock.add("audit_decode", started, rss)
+        if frame is None:
+            return accumulator, dropped
+
+        started, rss = time.perf_counter(), current_rss()
+        missing = [col for col in [y_true, y_pred, *attributes] if col not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {missing}, found {list(frame.columns)}")
+        complete = frame[[y_true, y_pred, *attributes]].dropna()
+        dropped += len(frame) - len(complete)
+        if len(complete):
+            codes, labels = frame_groups(complete, attributes)
+            accumulator.update(binary_outcome(complete[y_true], positive, threshold), binary_outcome(complete[y_pred], positive, threshold), codes, labels)
+        if clock:
+            clock.add("audit_accumulate", started, rss)
+
+class AuditStore:
+    # Accumulators by audit id, least recently used dropped past `keep`
+    def __init__(self, keep):
+        self.keep = keep
+        self._audits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, accumulator, audit_id=None):
+        # Merge into an existing audit (or start one); returns id and a report copy
+        with self._lock:
+            if audit_id is None:
+                audit_id = uuid.uuid4().hex[:12]
+                self._audits[audit_id] = ConfusionAccumulator(accumulator.attributes)
+            elif audit_id not in self._audits:
+                raise KeyError(audit_id)
+            target = self._audits[audit_id].merge(accumulator)
+            self._audits.move_to_end(audit_id)
+            while len(self._audits) > self.keep:
+                self._audits.popitem(last=False)
+            return audit_id, ConfusionAccumulator.from_state(target.state())
+
+    def get(self, audit_id):
+        with self._lock:
+            if audit_id not in self._audits:
+                raise KeyError(audit_id)
+            self._audits.move_to_end(audit_id)
+            return ConfusionAccumulator.from_state(self._audits[audit_id].state())
+
+audits = AuditStore(STREAM_AUDIT_KEEP)
+
+# --- INCREMENTAL APPEND ---
+# New batches are coded against an existing dataset's label lists and reuse
+# its fitted encoder: unseen labels are appended to the lists, so old codes
+# and encoded feature columns keep their meaning (new labels land in
+# "other" or their hash bucket). The result is a new derived dataset.
+def _extend_codes(values, labels, index):
+    # Map a chunk's labels onto (a growing copy of) the stored label list
+    category = _as_category(values)
+    lookup = np.empty(len(category.cat.categories), dtype=np.int64)
+    for i, label in enumerate(category.cat.categories):
+        label = str(label)
+        if label not in index:
+            index[label] = len(labels)
+            labels.append(label)
+        lookup[i] = index[label]
+    return lookup[np.asarray(category.cat.codes)]
+
+def _timestamps(values):
+    # Epoch seconds from a datetime or numeric (epoch seconds) column, NaN if unparsable
+    numbers = pd.to_numeric(values, errors="coerce")
+    if not numbers.isna().all():
+        return numbers.to_numpy(dtype=np.float64)
+    parsed = pd.to_datetime(values, errors="coerce", utc=True)
+    return ((parsed - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(seconds=1)).to_numpy(dtype=np.float64, na_value=np.nan)
+
+def append_rows(parent, frames, time_column=None):
+    categories = {col: list(labels) for col, labels in parent.categories.items()}
+    indexes = {col: {label: i for i, label in enumerate(labels)} for col, labels in categories.items()}
+    sensitive_labels = list(parent.sensitive_labels)
+    sensitive_index = {label: i for i, label in enumerate(sensitive_labels)}
+    target_index = None if parent.target_labels is None else {label: i for i, label in enumerate(parent.target_labels)}
+    required = [*parent.columns, parent.sensitive_name, parent.target_name]
+
+    clock = StageClock("dropna", "encode", "sample_index")
+    parts = {col: [] for col in parent.columns}
+    y_parts, s_parts, t_parts = [], [], []
+    rows = 0
+    for frame in frames:
+        rows += len(frame)
+        missing = [col for col in [*required, *([time_column] if time_column else [])] if col not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {missing}")
+
+        started, rss = time.perf_counter(), current_rss()
+        frame = frame.dropna(subset=required)
+        clock.add("dropna", started, rss)
+
+        started, rss = time.perf_counter(), current_rss()
+        for col in parent.columns:
+            if col in categories:
+                parts[col].append(_extend_codes(frame[col], categories[col], indexes[col]))
+            else:
+                parts[col].append(pd.to_numeric(frame[col]).to_numpy(dtype=np.float32))
+        s_parts.append(_extend_codes(frame[parent.sensitive_name], sensitive_labels, sensitive_index))
+        if target_index is None:
+            y_parts.append(_compact_target(frame[parent.target_name]))
+        else:
+            labels = frame[parent.target_name].astype(str)
+            unseen = set(labels.unique()) - set(target_index)
+            if unseen:
+                raise ValueError(f"Unseen target labels {sorted(unseen)}, expected {parent.target_labels}")
+            y_parts.append(labels.map(target_index).to_numpy(dtype=parent.y.dtype))
+        t_parts.append(_timestamps(frame[time_column]) if time_column else np.full(len(frame), time.time()))
+        clock.add("encode", started, rss)
+
+    if not y_parts or not sum(len(part) for part in y_parts):
+        raise ValueError("No complete rows found in the appended data")
+
+    started, rss = time.perf_counter(), current_rss()
+    new = {col: np.concatenate(values) for col, values in parts.items()}
+    batch = {
+        "columns": {col: values.astype(np.min_scalar_type(-len(categories[col]))) if col in categories else values for col, values in new.items()},
+        "categories": categories,
+        "y": np.concatenate(y_parts),
+        "sensitive_codes": np.concatenate(s_parts).astype(np.min_scalar_type(-len(sensitive_labels))),
+        "sensitive_labels": sensitive_labels,
+        "timestamps": np.concatenate(t_parts),
+    }
+    # Only the parent's first append may write into its spare room; a second
+    # append to the same parent would overwrite the first one's rows
+    in_place = not parent.extended
+    y = _append_array(parent.y, batch["y"], in_place)
+    sensitive_codes = _append_array(parent.sensitive_codes, batch["sensitive_codes"], in_place)
+    clock.add("encode", started, rss)
+
+    # The sample order is extended, not rebuilt: the parent's reservoir plus
+    # keys for the new rows, cut back to the reservoir size
+    started, rss = time.perf_counter(), current_rss()
+    reservoir = Reservoir(SAMPLE_RESERVOIR_ROWS, seed=SAMPLE_SEED + len(parent))
+    if parent.sample_keys is not None:
+        reservoir.rows, reservoir.keys = parent.sample_order, parent.sample_keys
+    else:
+        # Spilled before keys were kept: the stored order is a uniform sample,
+        # so fresh keys for it are as good
+        reservoir.rows, reservoir.keys = parent.sample_order, reservoir.rng.random(len(parent.sample_order))
+    reservoir.add(len(parent), len(batch["y"]))
+    sample_order, sample_keys = build_sample_order(y, sensitive_codes, reservoir)
+    clock.add("sample_index", started, rss)
+
+    dataset = ProcessedDataset(
+        columns={col: _append_array(parent.columns[col], values, in_place) for col, values in batch["columns"].items()},
+        categories=categories,
+        y=y,
+        sensitive_codes=sensitive_codes,
+        sensitive_labels=sensitive_labels,
+        sensitive_name=parent.sensitive_name,
+        target_name=parent.target_name,
+        encoder=parent.encoder,
+        sample_order=sample_order,
+        target_labels=parent.target_labels,
+        sample_keys=sample_keys,
+    )
+    parent.extended = True
+    clock.record()
+    return dataset, batch, rows
+
+# --- FAIRNESS DRIFT MONITOR ---
+# Appended batches feed per-dataset-lineage monitors: confusion counts per
+# sensitive group in fixed time windows (by the batch's time column, or
+# arrival time). Only the newest max_windows windows are kept. A window whose
+# selection-rate gap crosses the threshold raises an alert, and a later
+# batch that brings it back under resolves it.
+DRIFT_WINDOW_S = int(os.environ.get("DRIFT_WINDOW_S", 86400))
+DRIFT_MAX_WINDOWS = int(os.environ.get("DRIFT_MAX_WINDOWS", 30))
+DRIFT_THRESHOLD = float(os.environ.get("DRIFT_THRESHOLD", 0.1))
+DRIFT_ALERT_KEEP = int(os.environ.get("DRIFT_ALERT_KEEP", 100))
+DRIFT_MONITOR_KEEP = int(os.environ.get("DRIFT_MONITOR_KEEP", 64))
+drift_log = logging.getLogger("auditor.drift")
+
+class DriftMonitor:
+    def __init__(self, attribute, window_s=DRIFT_WINDOW_S, max_windows=DRIFT_MAX_WINDOWS, threshold=DRIFT_THRESHOLD, min_support=GROUP_MIN_SUPPORT):
+        self.attribute = attribute
+        self.window_s = window_s
+        self.max_windows = max_windows
+        self.threshold = threshold
+        self.min_support = min_support
+        self.windows = OrderedDict()  # window start -> ConfusionAccumulator, oldest first
+        self.scored = {}              # window start -> rows with model predictions
+        self.alerting = set()         # window starts currently over the threshold
+        self.alerts = deque(maxlen=DRIFT_ALERT_KEEP)
+        self.alerts_fired = 0
+
+    def observe(self, timestamps, y_true, y_pred, codes, labels):
+        # y_pred is None for plain decision logs: the gap is then measured on
+        # the decisions themselves and accuracy is not reported
+        known = ~np.isnan(timestamps)
+        starts = (timestamps[known] // self.window_s).astype(np.int64) * self.window_s
+        y_true, codes = y_true[known], codes[known]
+        y_pred = y_true if y_pred is None else y_pred[known]
+        touched = np.unique(starts)
+        for start in touched.tolist():
+            rows = starts == start
+            window = self.windows.get(start)
+            if window is None:
+                window = self.windows[start] = ConfusionAccumulator([self.attribute])
+            window.update(y_true[rows], y_pred[rows], codes[rows], labels)
+            if y_pred is not y_true:
+                self.scored[start] = self.scored.get(start, 0) + int(rows.sum())
+        self.windows = OrderedDict(sorted(self.windows.items()))
+        self._evict()
+        for start in touched.tolist():
+            if start in self.windows:
+                self._check(start)
+        return int((~known).sum())
+
+    def _evict(self):
+        # Bounded by count and by age relative to the newest window
+        newest = next(reversed(self.windows), None)
+        while self.windows and (len(self.windows) > self.max_windows or next(iter(self.windows)) <= newest - self.max_windows * self.window_s):
+            start, _ = self.windows.popitem(last=False)
+            self.scored.pop(start, None)
+            self.alerting.discard(start)
+
+    def _window_report(self, start):
+        window = self.windows[start]
+        report = subgroup_metrics(window.counts, window.labels, window.attributes, self.min_support)
+        groups = {label: {"selection_rate": group["selection_rate"], "accuracy": group["accuracy"] if self.scored.get(start) else None, "support": group["support"]} for label, group in report["groups"].items()}
+        return {
+            "window_start": datetime.fromtimestamp(start, timezone.utc).isoformat(),
+            "window_end": datetime.fromtimestamp(start + self.window_s, timezone.utc).isoformat(),
+            "rows": window.rows,
+            "scored_rows": self.scored.get(start, 0),
+            "parity_gap": report["demographic_parity_difference"],
+            "groups_reported": report["groups_reported"],
+            "alert": start in self.alerting,
+            "groups": groups,
+        }
+
+    def _check(self, start):
+        report = self._window_report(start)
+        over = report["groups_reported"] >= 2 and report["parity_gap"] > self.threshold
+        if over == (start in self.alerting):
+            return
+        if over:
+            self.alerting.add(start)
+            self.alerts_fired += 1
+        else:
+            self.alerting.discard(start)
+        rates = {label: group["selection_rate"] for label, group in report["groups"].items()}
+        self.alerts.append({
+            "type": "fired" if over else "resolved",
+            "at": datetime.now(timezone.utc).isoformat(),
+            "window_start": report["window_start"],
+            "parity_gap": report["parity_gap"],
+            "threshold": self.threshold,
+            "lowest_group": min(rates, key=rates.get) if rates else None,
+            "highest_group": max(rates, key=rates.get) if rates else None,
+        })
+        drift_log.warning(f"Fairness drift alert {self.alerts[-1]['type']}: {self.attribute} parity gap {report['parity_gap']:.3f} (threshold {self.threshold}) in window {report['window_start']}")
+
+    def latest_gap(self):
+        if not self.windows:
+            return None
+        return self._window_report(next(reversed(self.windows)))["parity_gap"]
+
+    def report(self):
+        return {
+            "attribute": self.attribute,
+            "window_s": self.window_s,
+            "max_windows": self.max_windows,
+            "threshold": self.threshold,
+            "min_support": self.min_support,
+            "alerts_fired": self.alerts_fired,
+            "alerting_windows": len(self.alerting),
+            "windows": [self._window_report(start) for start in self.windows],
+            "alerts": list(self.alerts),
+        }
+
+class MonitorStore:
+    # Monitors by lineage (the dataset_id of the original upload)
+    def __init__(self, keep):
+        self.keep = keep
+        self._monitors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, lineage, attribute, **config):
+        # Changing windowing starts the monitor over
+        with self._lock:
+            self._monitors[lineage] = DriftMonitor(attribute, **config)
+            self._evict()
+            return self._monitors[lineage]
+
+    def observe(self, lineage, attribute, *args):
+        with self._lock:
+            monitor = self._monitors.get(lineage)
+            if monitor is None:
+                monitor = self._monitors[lineage] = DriftMonitor(attribute)
+            self._monitors.move_to_end(lineage)
+            self._evict()
+            return monitor.observe(*args), monitor.report()
+
+    def report(self, lineage):
+        with self._lock:
+            monitor = self._monitors.get(lineage)
+            return None if monitor is None else monitor.report()
+
+    def gauges(self):
+        with self._lock:
+            return [(lineage, monitor.latest_gap(), monitor.alerts_fired) for lineage, monitor in self._monitors.items()]
+
+    def _evict(self):
+        while len(self._monitors) > self.keep:
+            self._monitors.popitem(last=False)
+
+monitors = MonitorStore(DRIFT_MONITOR_KEEP)
+
+# --- SHARED ARRAYS ---
+# Sweep tasks read the split from shared memory instead of each task
+# unpickling its own copy of X. The API process owns (and unlinks) the blocks.
+def share_arrays(arrays):
+    blocks, handles = [], {}
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[...] = values
+        blocks.append(block)
+        handles[name] = (block.name, values.shape, values.dtype.str)
+    return blocks, handles
+
+def share_matrix(name, X):
+    # Dense features are one block; CSR features are their three arrays
+    if sparse.issparse(X):
+        X = X.tocsr()
+        return {f"{name}.data": X.data, f"{name}.indices": X.indices, f"{name}.indptr": X.indptr,
+                f"{name}.shape": np.array(X.shape)}
+    return {name: np.asarray(X, dtype=np.float32)}
+
+def unshare_matrix(arrays, name):
+    if name in arrays:
+        return arrays[name]
+    shape = tuple(int(v) for v in arrays[f"{name}.shape"])
+    return sparse.csr_matrix((arrays[f"{name}.data"], arrays[f"{name}.indices"], arrays[f"{name}.indptr"]), shape=shape, copy=False)
+
+def release_arrays(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+# Worker-side attachments, kept open while the views are in use
+_attached_blocks = {}
+
+def attach_arrays(handles):
+    arrays = {}
+    for name, (block_name, shape, dtype) in handles.items():
+        block = _attached_blocks.get(block_name)
+        if block is None:
+            # Pool workers share the API process's resource tracker, so
+            # attaching doesn't add a second owner: only the API unlinks
+            block = shared_memory.SharedMemory(name=block_name)
+            _attached_blocks[block_name] = block
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return arrays
+
+def detach_arrays(handles):
+    for block_name, _, _ in handles.values():
+        block = _attached_blocks.pop(block_name, None)
+        if block is not None:
+            try:
+                block.close()
+            except BufferError:  # a view is still alive; the mapping goes when it does
+                pass
+
+# --- PARETO SWEEP ---
+# Names of fairlearn.reductions constraint classes (resolved lazily)
+SWEEP_CONSTRAINTS = ("DemographicParity", "EqualizedOdds", "TruePositiveRateParity")
+SWEEP_MAX_POINTS = int(os.environ.get("SWEEP_MAX_POINTS", 200))
+
+class SweepRequest(TrainRequest):
+    difference_bounds: List[float] = [0.01, 0.02, 0.05, 0.1]
+    constraints: List[str] = list(SWEEP_CONSTRAINTS)
+    max_depths: List[int] = [3, 5, 8]
+    pareto_metric: str = "bias_gap"  # or "equalized_odds_difference"
+    stream: bool = False
+
+def fit_sweep_point(handles, labels, constraint, bound, max_depth, seed=None):
+    data = attach_arrays(handles)
+    X_train, X_test = unshare_matrix(data, "X_train"), unshare_matrix(data, "X_test")
+    s_test = pd.Series(pd.Categorical.from_codes(data["s_test"], categories=labels))
+
+    started = time.perf_counter()
+    mitigator, y_pred = fit_reduction(
+        X_train, data["y_train"], data["s_train"], X_test,
+        getattr(fairlearn_reductions, constraint)(difference_bound=bound), max_depth=max_depth, seed=seed,
+    )
+    fit_s = time.perf_counter() - started
+
+    payload = summarize_predictions(data["y_test"], y_pred, s_test)
+    del mitigator, data, X_train, X_test
+    detach_arrays(handles)
+    return {
+        "constraint": constraint, "difference_bound": bound, "max_depth": max_depth,
+        "accuracy": payload["accuracy"],
+        "bias_gap": payload["bias_gap"],
+        "equalized_odds_difference": payload["equalized_odds_difference"],
+        "disparate_impact_ratio": payload["disparate_impact_ratio"],
+        "fit_s": round(fit_s, 4),
+    }
+
+def pareto_front(points, metric="bias_gap"):
+    # Keep points no other point beats on both accuracy (up) and metric (down)
+    order = sorted(points, key=lambda p: (p[metric], -p["accuracy"]))
+    front, best_accuracy = [], -np.inf
+    for point in order:
+        if point["accuracy"] > best_accuracy:
+            front.append(point)
+            best_accuracy = point["accuracy"]
+    return front
+
+# --- STARTUP: LIVENESS, READINESS, PRE-WARM ---
+# /healthz only says the process is up; /readyz says whether it should take
+# traffic (503 while a pre-warm is still running). Import and warm-up times
+# are checked against budgets so slow starts show up in probes and /metrics.
+API_IMPORT_BUDGET_S = float(os.environ.get("API_IMPORT_BUDGET_S", 1.0))
+WORKER_WARM_BUDGET_S = float(os.environ.get("WORKER_WARM_BUDGET_S", 15.0))
+startup = {"module_import_s": None, "prewarm": "running" if STARTUP_MODE == "prewarm" else "off", "workers": []}
+
+def warm_worker():
+    # Runs in a pool worker: import the ML stack and do one tiny fit, so the
+    # first real request pays for neither
+    started = time.perf_counter()
+    import_ml_stack()
+    imported = time.perf_counter()
+    X, y, sex = generate_synthetic_data(200, seed=0)
+    fit_mitigated(split_data(X, y, sex, seed=0), seed=0)
+    return {"pid": os.getpid(), "import_s": round(imported - started, 4), "warm_fit_s": round(time.perf_counter() - imported, 4)}
+
+async def prewarm():
+    started = time.perf_counter()
+    try:
+        # Import in the API process first, so forked workers inherit the modules
+        await asyncio.to_thread(import_ml_stack)
+        job_ids = [jobs.submit("prewarm", warm_worker) for _ in range(jobs.workers)]
+        finished = await asyncio.gather(*(jobs.wait(job_id) for job_id in job_ids))
+        failed = [job for job in finished if job["status"] != "done"]
+        if failed:
+            raise RuntimeError(failed[0].get("error") or failed[0]["status"])
+        startup["workers"] = [job["result"] for job in finished]
+        startup["prewarm"] = "done"
+    except Exception as e:
+        # A failed warm-up only costs latency: requests still load lazily
+        startup["prewarm"] = "failed"
+        startup["error"] = f"{type(e).__name__}: {e}"
+    startup["prewarm_s"] = round(time.perf_counter() - started, 3)
+
+def readiness():
+    worker_warm_s = max((w["import_s"] + w["warm_fit_s"] for w in startup["workers"]), default=None)
+    info = {
+        "ready": startup["prewarm"] != "running",
+        "mode": STARTUP_MODE,
+        "prewarm": startup["prewarm"],
+        "ml_stack_loaded": all(module._module is not None for module in LAZY_MODULES),
+        "import_s": {"main": startup["module_import_s"], **import_timings},
+        "workers": startup["workers"],
+        "budget": {
+            "api_import_s": API_IMPORT_BUDGET_S,
+            "api_within": startup["module_import_s"] is not None and startup["module_import_s"] <= API_IMPORT_BUDGET_S,
+            "worker_warm_s": WORKER_WARM_BUDGET_S,
+            "worker_within": None if worker_warm_s is None else worker_warm_s <= WORKER_WARM_BUDGET_S,
+        },
+    }
+    for key in ("prewarm_s", "error"):
+        if key in startup:
+            info[key] = startup[key]
+    return info
 
 @app.get("/")
 def home():
     return {"message": "Backend Ready"}
 
+# Probes are async so they answer on the event loop even when the
+# threadpool is busy parsing uploads
+@app.get("/healthz")
+async def healthz():
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readyz():
+    info = readiness()
+    return JSONResponse(info, status_code=200 if info["ready"] else 503)
+
+@app.get("/datasets")
+def list_datasets():
+    return registry.summary()
+
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    try:
-        # Read file
-        contents = await file.read()
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-        
-        # Process it
-        X, y, sensitive = process_dataframe(df)
-        
-        # Save to Global Store
-        data_store["X"] = X
-        data_store["y"] = y
-        data_store["sensitive"] = sensitive
-        data_store["is_uploaded"] = True
-        
-        return {"message": "File processed", "rows": len(df), "sensitive_col": sensitive.name}
+def upload_file(
+    file: UploadFile = File(...),
+    encoding: str = "onehot",
+    max_categories: int = Query(100, ge=1),
+    hash_buckets: int = Query(1024, ge=1),
+    append_to: Optional[str] = None,
+    time_column: Optional[str] = None,
+    model: Optional[str] = None,
+):
+    # Sync handler: FastAPI runs it in the threadpool, so parsing a large
+    # upload doesn't stall the event loop.
+    try:
+        if append_to is not None:
+            return append_upload(file.file, append_to, time_column, model)
+        return process_upload(file.file, {"mode": encoding, "max_categories": max_categories, "hash_buckets": hash_buckets})
     except Exception as e:
         return {"error": str(e)}
 
-@app.post("/train/biased")
-def train_biased(req: TrainRequest):
-    # USE UPLOADED DATA IF AVAILABLE, ELSE SYNTHETIC
-    if data_store["is_uploaded"]:
-        X, y, sex = data_store["X"], data_store["y"], data_store["sensitive"]
-        # Resample to requested size if needed
-        if len(X) > req.n_samples:
-             X = X.sample(n=req.n_samples, random_state=42)
-             y = y.loc[X.index]
-             sex = sex.loc[X.index]
-    else:
-        X, y, sex = generate_synthetic_data(req.n_samples)
+def process_upload(raw, encoder_config, expected_digest=None):
+    # Identical bytes with the same encoder settings were already
+    # processed: hand back the same dataset
+    digest = content_hash(raw)
+    if expected_digest is not None and digest != expected_digest:
+        raise ValueError(f"Content hash mismatch: expected {expected_digest}, received {digest}")
+    dataset_id = dataset_key(digest, encoder_config)
+    entry = registry.get(dataset_id)
+    if entry is not None:
+        return {**entry["info"], "deduplicated": True}
 
-    X_train, X_test, y_train, y_test, s_train, s_test = train_test_split(X, y, sex, test_size=0.3)
-    
-    model = DecisionTreeClassifier(max_depth=5)
-    model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
-    
-    acc = accuracy_score(y_test, y_pred)
+    # Stream-parse straight from the spooled upload
+    dataset, stats = ingest_csv(raw, encoder_config)
+
+    info = {
+        "message": "File processed",
+        "dataset_id": dataset_id,
+        "rows": stats["rows"],
+        "rows_kept": len(dataset),
+        "sensitive_col": dataset.sensitive_name,
+        "chunks": stats["chunks"],
+        "compression": stats["compression"],
+        "peak_rss_growth_mb": stats["peak_rss_growth_mb"],
+        "stored_mb": round(dataset.nbytes / 2**20, 2),
+        "sample_index_rows": len(dataset.sample_order),
+        "sensitive_candidates": [dataset.sensitive_name] + [col for col in dataset.columns if col.lower() in SENSITIVE_NAMES],
+        "features": encoding_report(dataset),
+        "lineage": dataset_id,
+    }
+    evicted = registry.put(dataset_id, {"dataset": dataset, "info": info})
+    return {**info, "deduplicated": False, "evicted": evicted}
+
+_append_lock = threading.Lock()
+
+def append_upload(raw, parent_id, time_column=None, model=None):
+    # Append mode: parent rows + this batch become a new dataset (its
+    # columns grow in place), and the batch is fed to the lineage's drift
+    # monitor. The parent stays: other clients may hold its content-hashed
+    # id, so it is left to the registry's LRU budget
+    dataset_id = hashlib.sha256(f"{parent_id}+{content_hash(raw)}".encode()).hexdigest()[:16]
+    # One append at a time: each writes into the spare room behind its parent's columns
+    with _append_lock:
+        entry = registry.get(dataset_id)
+        if entry is not None:
+            return {**entry["info"], "deduplicated": True}
+        parent_entry = registry.get(parent_id)
+        if parent_entry is None:
+            raise ValueError(f"Unknown dataset '{parent_id}', upload it first (or append to the dataset_id the last append returned)")
+        return _append_batch(raw, parent_id, parent_entry, dataset_id, time_column, model)
+
+def _append_batch(raw, parent_id, parent_entry, dataset_id, time_column, model):
+    parent, parent_info = parent_entry["dataset"], parent_entry["info"]
+
+    text_columns = [*parent.categories, *([parent.target_name] if parent.target_labels is not None else [])]
+    frames = prediction_frames(raw, text_columns)
     try:
-        gap = demographic_parity_difference(y_test, y_pred, sensitive_features=s_test)
-        frame = MetricFrame(metrics=selection_rate, y_true=y_test, y_pred=y_pred, sensitive_features=s_test)
-        rates = frame.by_group.to_dict()
-        # Handle cases where keys might be 0/1 instead of strings
-        female_rate = rates.get('Female', rates.get(1, 0.0))
-        male_rate = rates.get('Male', rates.get(0, 0.0))
-    except:
-        gap = 0.0
-        female_rate = 0.0
-        male_rate = 0.0
+        dataset, batch, rows = append_rows(parent, frames, time_column)
+    finally:
+        frames.close()
+
+    predictions = None
+    if model is not None:
+        # Score the new rows with a stored model, so windows report accuracy too
+        try:
+            ensemble = artifacts.load(model)
+            X = encode_sparse(batch["columns"], batch["categories"], ensemble.encoder)
+        except KeyError as e:
+            raise ValueError(f"Cannot score with model '{model}': unknown model or feature {e}")
+        predictions = ensemble.predict(ensemble.score(X), np.random.RandomState(SAMPLE_SEED))
 
+    lineage = parent_info.get("lineage", parent_id)
+    unstamped, monitor = monitors.observe(
+        lineage, parent.sensitive_name,
+        batch["timestamps"], batch["y"], predictions, batch["sensitive_codes"], batch["sensitive_labels"],
+    )
+    info = {
+        **parent_info,
+        "message": "Rows appended",
+        "dataset_id": dataset_id,
+        "parent_id": parent_id,
+        "lineage": lineage,
+        "rows": parent_info["rows"] + rows,
+        "rows_kept": len(dataset),
+        "rows_appended": len(batch["y"]),
+        "stored_mb": round(dataset.nbytes / 2**20, 2),
+        "sample_index_rows": len(dataset.sample_order),
+        "features": encoding_report(dataset),
+    }
+    evicted = registry.put(dataset_id, {"dataset": dataset, "info": info})
     return {
-        "accuracy": float(acc),
-        "bias_gap": float(gap),
-        "female_rate": float(female_rate),
-        "male_rate": float(male_rate)
+        **info, "deduplicated": False, "evicted": evicted,
+        "drift": {"rows_without_time": unstamped, "alerting_windows": monitor["alerting_windows"], "latest_window": monitor["windows"][-1] if monitor["windows"] else None},
     }
 
+class UploadInit(BaseModel):
+    size: int = Field(..., ge=0)      # bytes that will be PUT (after any compression)
+    sha256: Optional[str] = None      # of the uncompressed CSV; lets us skip data we already have
+    encoding: str = "onehot"
+    max_categories: int = Field(100, ge=1)
+    hash_buckets: int = Field(1024, ge=1)
+    append_to: Optional[str] = None
+    time_column: Optional[str] = None
+    model: Optional[str] = None
+
+def hashed_dataset(digest, encoding="onehot", max_categories=100, hash_buckets=1024):
+    entry = registry.get(dataset_key(digest, {"mode": encoding, "max_categories": max_categories, "hash_buckets": hash_buckets}))
+    return None if entry is None else {**entry["info"], "deduplicated": True}
+
+def upload_session(upload_id):
+    try:
+        return uploads.status(upload_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired upload '{upload_id}'")
+
+@app.get("/datasets/by-hash/{sha256}")
+def dataset_by_hash(sha256: str, encoding: str = "onehot", max_categories: int = Query(100, ge=1), hash_buckets: int = Query(1024, ge=1)):
+    # Clients hash first and only send bytes when this is a 404
+    info = hashed_dataset(sha256, encoding, max_categories, hash_buckets)
+    if info is None:
+        raise HTTPException(status_code=404, detail="No dataset with this content and encoding")
+    return info
+
+@app.post("/uploads")
+def start_upload(req: UploadInit):
+    if req.sha256 and req.append_to is None:
+        info = hashed_dataset(req.sha256, req.encoding, req.max_categories, req.hash_buckets)
+        if info is not None:
+            return {"upload_id": None, "dataset": info}
+    if req.size > UPLOAD_MAX_MB * 2**20:
+        raise HTTPException(status_code=413, detail=f"Uploads are limited to {UPLOAD_MAX_MB} MB")
+    upload_id = uploads.create(req.size, req.model_dump())
+    return {**upload_session(upload_id), "chunk_hint_bytes": 8 * 2**20}
+
+@app.get("/uploads/{upload_id}")
+def upload_status(upload_id: str):
+    # Where to resume after a dropped connection
+    return upload_session(upload_id)
+
+@app.put("/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request, offset: int = 0):
+    # Bytes are written as they arrive; if the connection drops, what was
+    # written still counts and GET /uploads/{id} reports where to resume
+    try:
+        path, size = uploads.begin_write(upload_id, offset)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired upload '{upload_id}'")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail={"message": "Resume from the current offset", "offset": e.args[0]})
+    written = offset
+    try:
+        with open(path, "r+b") as f:
+            f.seek(offset)
+            async for block in request.stream():
+                if written + len(block) > size:
+                    raise HTTPException(status_code=413, detail=f"Upload is larger than the declared {size} bytes")
+                f.write(block)
+                written += len(block)
+    finally:
+        uploads.end_write(upload_id, written)
+    return upload_session(upload_id)
+
+@app.post("/uploads/{upload_id}/complete")
+def complete_upload(upload_id: str):
+    upload_session(upload_id)
+    try:
+        session = uploads.take(upload_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail={"message": "Upload is not complete", "offset": e.args[0]})
+    params = session["params"]
+    try:
+        with open(session["path"], "rb") as raw:
+            if params["append_to"] is not None:
+                return append_upload(raw, params["append_to"], params["time_column"], params["model"])
+            encoder_config = {"mode": params["encoding"], "max_categories": params["max_categories"], "hash_buckets": params["hash_buckets"]}
+            return process_upload(raw, encoder_config, params["sha256"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        os.remove(session["path"])
+
+class MonitorConfig(BaseModel):
+    window_s: int = Field(DRIFT_WINDOW_S, gt=0)
+    max_windows: int = Field(DRIFT_MAX_WINDOWS, ge=1)
+    threshold: float = Field(DRIFT_THRESHOLD, ge=0, le=1)
+    min_support: int = Field(GROUP_MIN_SUPPORT, ge=1)
+
+def dataset_lineage(dataset_id):
+    entry = registry.get(dataset_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset '{dataset_id}'")
+    return entry["info"].get("lineage", dataset_id), entry["dataset"].sensitive_name
+
+@app.put("/monitors/{dataset_id}")
+def configure_monitor(dataset_id: str, config: MonitorConfig):
+    # (Re)start drift monitoring for the dataset's lineage with new windows
+    lineage, attribute = dataset_lineage(dataset_id)
+    return {"lineage": lineage, **monitors.configure(lineage, attribute, **config.model_dump()).report()}
+
+@app.get("/monitors/{dataset_id}")
+def monitor_report(dataset_id: str):
+    lineage, _ = dataset_lineage(dataset_id)
+    report = monitors.report(lineage)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"No batches appended to '{lineage}' yet")
+    return {"lineage": lineage, **report}
+
+@app.get("/cache/stats")
+def cache_stats():
+    return results.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus scrape target: stage histograms plus a few process gauges
+    cache = results.stats()
+    lines = stage_metrics.prometheus()
+    lines += [
+        "# HELP auditor_process_resident_memory_bytes Resident memory of the API process.",
+        "# TYPE auditor_process_resident_memory_bytes gauge",
+        f"auditor_process_resident_memory_bytes {current_rss() or 0}",
+        "# HELP auditor_datasets_bytes Bytes held by in-memory datasets.",
+        "# TYPE auditor_datasets_bytes gauge",
+        f"auditor_datasets_bytes {registry.used_bytes()}",
+        "# HELP auditor_result_cache_lookups_total Result cache lookups by outcome.",
+        "# TYPE auditor_result_cache_lookups_total counter",
+        f'auditor_result_cache_lookups_total{{outcome="hit_memory"}} {cache["hits_memory"]}',
+        f'auditor_result_cache_lookups_total{{outcome="hit_disk"}} {cache["hits_disk"]}',
+        f'auditor_result_cache_lookups_total{{outcome="miss"}} {cache["misses"]}',
+        "# HELP auditor_jobs Jobs in the history by status.",
+        "# TYPE auditor_jobs gauge",
+    ]
+    lines += [f'auditor_jobs{{status="{state}"}} {count}' for state, count in jobs.counts().items()]
+    info = readiness()
+    lines += [
+        "# HELP auditor_ready 1 once the API should receive traffic.",
+        "# TYPE auditor_ready gauge",
+        f"auditor_ready {int(info['ready'])}",
+        "# HELP auditor_import_seconds First-import time of the API module and each lazily loaded library.",
+        "# TYPE auditor_import_seconds gauge",
+    ]
+    lines += [f'auditor_import_seconds{{module="{name}"}} {seconds}' for name, seconds in info["import_s"].items() if seconds is not None]
+    drift = monitors.gauges()
+    lines += [
+        "# HELP auditor_drift_parity_gap Selection-rate gap in the newest window of each drift monitor.",
+        "# TYPE auditor_drift_parity_gap gauge",
+    ]
+    lines += [f'auditor_drift_parity_gap{{lineage="{lineage}"}} {gap}' for lineage, gap, _ in drift if gap is not None]
+    lines += [
+        "# HELP auditor_drift_alerts_total Drift alerts fired per monitor.",
+        "# TYPE auditor_drift_alerts_total counter",
+    ]
+    lines += [f'auditor_drift_alerts_total{{lineage="{lineage}"}} {fired}' for lineage, _, fired in drift]
+    return "\n".join(lines) + "\n"
+
+@app.post("/train/biased")
+def train_biased(req: TrainRequest):
+    key = result_key("biased", req)
+    entry, tier = results.get(key)
+    if entry is not None:
+        return cached_payload(entry, tier)
+
+    X, y, sex = load_training_data(req)
+    groups = intersection_groups(req, sex)
+    return finish_training("biased", key, req, training_encoder(req), run_biased(X, y, sex, req.seed, req.bootstrap, req.ci_level, groups))
+
 @app.post("/train/mitigated")
-def train_mitigated(req: TrainRequest):
-    if data_store["is_uploaded"]:
-        X, y, sex = data_store["X"], data_store["y"], data_store["sensitive"]
-        if len(X) > req.n_samples:
-             X = X.sample(n=req.n_samples, random_state=42)
-             y = y.loc[X.index]
-             sex = sex.loc[X.index]
-    else:
-        X, y, sex = generate_synthetic_data(req.n_samples)
+async def train_mitigated(req: TrainRequest):
+    # Same contract as before, but the fit runs in the job pool so the
+    # event loop stays free for cheap requests while we wait.
+    key = result_key("mitigated", req)
 
-    X_train, X_test, y_train, y_test, s_train, s_test = train_test_split(X, y, sex, test_size=0.3)
-    
-    mitigator = ExponentiatedGradient(
-        estimator=DecisionTreeClassifier(max_depth=5),
-        constraints=DemographicParity()
+    def prepare():
+        # Cache lookup (maybe a disk read), sampling and encoding run in a
+        # thread, so the event loop keeps serving other requests meanwhile
+        entry, tier = results.get(key)
+        if entry is not None:
+            return cached_payload(entry, tier), None
+        X, y, sex = load_training_data(req)
+        return None, (X, y, sex, intersection_groups(req, sex), training_encoder(req))
+
+    cached, prepared = await asyncio.to_thread(prepare)
+    if cached is not None:
+        return cached
+
+    X, y, sex, groups, encoder = prepared
+    job_id = jobs.submit(
+        "mitigated", run_mitigated, X, y, sex, req.seed, req.bootstrap, req.ci_level, groups, fast_options(req),
+        on_result=lambda result: finish_training("mitigated", key, req, encoder, finish_reduction(req, result)),
     )
-    mitigator.fit(X_train, y_train, sensitive_features=s_train)
-    y_pred = mitigator.predict(X_test)
-    
-    acc = accuracy_score(y_test, y_pred)
-    try:
-        gap = demographic_parity_difference(y_test, y_pred, sensitive_features=s_test)
-        frame = MetricFrame(metrics=selection_rate, y_true=y_test, y_pred=y_pred, sensitive_features=s_test)
-        rates = frame.by_group.to_dict()
-        female_rate = rates.get('Female', rates.get(1, 0.0))
-        male_rate = rates.get('Male', rates.get(0, 0.0))
-    except:
-        gap = 0.0
-        female_rate = 0.0
-        male_rate = 0.0
+    job = await jobs.wait(job_id)
+    if job["status"] != "done":
+        raise HTTPException(status_code=500, detail=job.get("error") or job["status"])
+    server_timing("fit_mitigated", job["result"]["timings"]["fit_s"])
+    server_timing("metrics", job["result"]["timings"]["metrics_s"])
+    return job["result"]
+
+@app.post("/audit")
+async def audit(req: TrainRequest):
+    # Baseline and mitigated models on the SAME sample and split, fitted
+    # concurrently: the tree in a thread, the reduction in the job pool.
+    key = result_key("audit", req)
+
+    def prepare():
+        # Cache lookup (maybe a disk read), load, subgroup codes and the
+        # split all run in one thread, so the event loop keeps serving other
+        # requests meanwhile
+        entry, tier = results.get(key)
+        if entry is not None:
+            return cached_payload(entry, tier), None
+        X, y, sex = load_training_data(req)
+        loaded = time.perf_counter()
+        groups = intersection_groups(req, sex)
+        split = split_data(X, y, sex, req.seed)
+        return None, (loaded, groups, split, time.perf_counter(), training_encoder(req))
+
+    started = time.perf_counter()
+    cached, prepared = await asyncio.to_thread(prepare)
+    if cached is not None:
+        return cached
+    loaded, groups, split, split_done, encoder = prepared
+
+    models = {}
+
+    def keep_model(result):
+        result = finish_reduction(req, result)
+        result["artifact"] = save_artifact("mitigated", req, result["model"], encoder)
+        models["mitigated"] = result.pop("model")
+        return result
+
+    job_id = jobs.submit("audit", fit_mitigated, split, req.seed, req.bootstrap, req.ci_level, groups, fast_options(req), on_result=keep_model)
+    baseline, job = await asyncio.gather(
+        asyncio.to_thread(fit_biased, split, req.seed, req.bootstrap, req.ci_level, groups),
+        jobs.wait(job_id),
+    )
+    if job["status"] != "done":
+        raise HTTPException(status_code=500, detail=job.get("error") or job["status"])
+    models["baseline"] = baseline.pop("model")
+    mitigated = job["result"]
+    server_timing("fit_mitigated", mitigated["timings"]["fit_s"])
+    server_timing("metrics", mitigated["timings"]["metrics_s"])
+
+    def store(payload):
+        # Artifact save and cache write (with its eviction scan) touch disk
+        baseline["artifact"] = save_artifact("biased", req, models["baseline"], encoder)
+        return cache_result(key, payload)
+
+    return await asyncio.to_thread(store, {
+        "baseline": baseline,
+        "mitigated": mitigated,
+        "test_rows": split[1].shape[0],
+        "timings": {
+            "load_s": round(loaded - started, 4),
+            "split_s": round(split_done - loaded, 4),
+            "baseline_fit_s": baseline["timings"]["fit_s"],
+            "baseline_metrics_s": baseline["timings"]["metrics_s"],
+            "mitigated_fit_s": mitigated["timings"]["fit_s"],
+            "mitigated_metrics_s": mitigated["timings"]["metrics_s"],
+            "total_s": round(time.perf_counter() - started, 4),
+        },
+        "model": models,
+    })
+
+@app.post("/sweep")
+async def sweep(req: SweepRequest):
+    if req.pareto_metric not in ("bias_gap", "equalized_odds_difference"):
+        raise HTTPException(status_code=400, detail="pareto_metric must be 'bias_gap' or 'equalized_odds_difference'")
+    unknown = [name for name in req.constraints if name not in SWEEP_CONSTRAINTS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown constraints {unknown}, choose from {list(SWEEP_CONSTRAINTS)}")
+    grid = list(itertools.product(req.constraints, req.difference_bounds, req.max_depths))
+    if not grid or len(grid) > SWEEP_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"Sweep grid must have 1-{SWEEP_MAX_POINTS} points, got {len(grid)}")
+
+    def prepare():
+        # Load and split in a thread, off the event loop
+        X, y, sex = load_training_data(req)
+        return split_data(X, y, sex, req.seed)
 
+    X_train, X_test, y_train, y_test, s_train, s_test = await asyncio.to_thread(prepare)
+    codes, labels = group_codes(pd.concat([s_train, s_test]))
+    blocks, handles = share_arrays({
+        **share_matrix("X_train", X_train), **share_matrix("X_test", X_test),
+        "y_train": np.asarray(y_train), "y_test": np.asarray(y_test),
+        "s_train": codes[:len(s_train)], "s_test": codes[len(s_train):],
+    })
+    job_ids = [
+        jobs.submit("sweep", fit_sweep_point, handles, labels, constraint, bound, depth, req.seed)
+        for constraint, bound, depth in grid
+    ]
+
+    async def points():
+        # Yield each grid point as soon as its fit finishes
+        try:
+            for finished in asyncio.as_completed([jobs.wait(job_id) for job_id in job_ids]):
+                job = await finished
+                if job["status"] == "done":
+                    yield {k: v for k, v in job["result"].items() if k != "timings"}
+                else:
+                    yield {"job_id": job["job_id"], "status": job["status"], "error": job.get("error")}
+        finally:
+            # Client went away or we're done: stop leftovers, free the data
+            for job_id in job_ids:
+                try:
+                    jobs.cancel(job_id)
+                except HTTPException:  # already dropped from the job history
+                    pass
+            release_arrays(blocks)
+
+    started = time.perf_counter()
+    if req.stream:
+        async def lines():
+            done = []
+            async for point in points():
+                if "accuracy" in point:
+                    done.append(point)
+                yield json.dumps({"type": "point", **point}) + "\n"
+            yield json.dumps({
+                "type": "summary", "points": len(done), "pareto": pareto_front(done, req.pareto_metric),
+                "elapsed_s": round(time.perf_counter() - started, 3),
+            }) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    swept = [point async for point in points()]
+    done = [point for point in swept if "accuracy" in point]
     return {
-        "accuracy": float(acc),
-        "bias_gap": float(gap),
-        "female_rate": float(female_rate),
-        "male_rate": float(male_rate)
-    }
\ No newline at end of file
+        "points": swept,
+        "pareto": pareto_front(done, req.pareto_metric),
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+
+@app.post("/synthetic")
+def synthetic_dataset(spec: SyntheticSpec, format: str = "csv", compress: bool = False):
+    # Load-test data with a known bias. CSV is streamed chunk by chunk
+    # (gzip with compress=true); Parquet is written to a temp file first.
+    # The injected gap is returned in headers to check audits against.
+    if spec.rows > SYNTHETIC_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"rows is capped at {SYNTHETIC_MAX_ROWS} (SYNTHETIC_MAX_ROWS)")
+    if spec.chunk_rows > SYNTHETIC_CHUNK_ROWS:
+        raise HTTPException(status_code=400, detail=f"chunk_rows is capped at {SYNTHETIC_CHUNK_ROWS} (SYNTHETIC_CHUNK_ROWS)")
+    try:
+        truth = synthetic_truth(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {
+        "X-Injected-Parity-Gap": f"{truth['demographic_parity_difference']:.6g}",
+        "X-Injected-Impact-Ratio": f"{truth['disparate_impact_ratio']:.6g}",
+    }
+
+    if format == "parquet":
+        if pa is None:
+            raise HTTPException(status_code=400, detail="Parquet output needs pyarrow installed")
+        fd, path = tempfile.mkstemp(suffix=".parquet")
+        os.close(fd)
+        write_synthetic(spec, path, "parquet")
+        return FileResponse(path, media_type="application/vnd.apache.parquet", filename="synthetic.parquet", headers=headers, background=BackgroundTask(os.remove, path))
+    if format != "csv":
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}', choose csv or parquet")
+
+    def chunks():
+        packer = zlib.compressobj(GZIP_LEVEL, wbits=31) if compress else None  # 31 = gzip container
+        for i, frame in enumerate(synthetic_frames(spec)):
+            data = synthetic_csv(frame, header=i == 0)
+            yield packer.compress(data) if packer else data
+        if packer:
+            yield packer.flush()
+
+    if compress:
+        headers["Content-Disposition"] = 'attachment; filename="synthetic.csv.gz"'
+    return StreamingResponse(chunks(), media_type="application/gzip" if compress else "text/csv", headers=headers)
+
+@app.get("/models")
+def list_models():
+    return artifacts.summary()
+
+@app.post("/predict")
+def predict(
+    file: UploadFile = File(...),
+    model: str = "mitigated-synthetic",
+    version: Optional[int] = None,
+    seed: Optional[int] = None,
+    stream: bool = False,
+):
+    # Score a CSV or Arrow batch with a stored model. Chunks are encoded and
+    # scored one at a time; seed makes the mitigated model's draws repeatable.
+    try:
+        ensemble = artifacts.load(model, version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model '{model}'" + (f" version {version}" if version else "") + ", see GET /models")
+
+    random_state = np.random.RandomState(seed)
+    clock = StageClock("predict_decode", "predict_encode", "predict_score")
+
+    def scored():
+        frames = prediction_frames(file.file, ensemble.encoder["categorical"])
+        try:
+            while True:
+                started, rss = time.perf_counter(), current_rss()
+                frame = next(frames, None)
+                clock.add("predict_decode", started, rss)
+                if frame is None:
+                    return
+                started, rss = time.perf_counter(), current_rss()
+                X = encode_frame(frame, ensemble.encoder)
+                clock.add("predict_encode", started, rss)
+                started, rss = time.perf_counter(), current_rss()
+                scores = ensemble.score(X)
+                predictions = ensemble.predict(scores, random_state)
+                clock.add("predict_score", started, rss)
+                yield predictions, scores
+        finally:
+            # Close the reader while the upload is still open
+            frames.close()
+
+    chunks = scored()
+    try:
+        # Bad input (missing columns, unreadable file) fails before we stream
+        first = next(chunks, None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    chunks = itertools.chain([] if first is None else [first], chunks)
+    header = {"model": ensemble.name, "version": ensemble.version}
+
+    if stream:
+        def lines():
+            rows = positives = 0
+            for predictions, scores in chunks:
+                yield json.dumps({"type": "chunk", "offset": rows, "predictions": predictions.tolist(), "scores": np.round(scores, 6).tolist()}) + "\n"
+                rows += len(predictions)
+                positives += int(predictions.sum())
+            clock.record()
+            yield json.dumps({"type": "summary", **header, "rows": rows, "positive_rate": positives / rows if rows else None}) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    try:
+        parts = list(chunks)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    clock.record()
+    predictions = np.concatenate([p for p, _ in parts]) if parts else np.zeros(0, dtype=np.int64)
+    scores = np.concatenate([s for _, s in parts]) if parts else np.zeros(0)
+    return {
+        **header,
+        "rows": len(predictions),
+        "positive_rate": float(predictions.mean()) if len(predictions) else None,
+        "predictions": predictions.tolist(),
+        "scores": np.round(scores, 6).tolist(),
+    }
+
+class MergeAuditsRequest(BaseModel):
+    audit_ids: List[str] = []
+    states: List[dict] = []  # from GET /audits/{id}/state, e.g. other workers
+    min_support: int = Field(GROUP_MIN_SUPPORT, ge=1)
+
+def stored_audit(audit_id):
+    try:
+        return audits.get(audit_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown audit '{audit_id}'")
+
+@app.post("/audits/predictions")
+def audit_predictions(
+    file: UploadFile = File(...),
+    sensitive: str = "sex",
+    y_true: str = "y_true",
+    y_pred: str = "y_pred",
+    audit_id: Optional[str] = None,
+    positive: Optional[str] = None,
+    threshold: float = 0.5,
+    min_support: int = GROUP_MIN_SUPPORT,
+):
+    # Fold a (y_true, y_pred, sensitive...) log into an audit, new or existing
+    # (audit_id). sensitive is comma-separated; several columns are audited
+    # as intersections.
+    attributes = list(dict.fromkeys(col.strip() for col in sensitive.split(",") if col.strip()))
+    if not attributes:
+        raise HTTPException(status_code=400, detail="Name at least one sensitive column")
+    if audit_id is not None:
+        existing = stored_audit(audit_id)
+        if existing.attributes != attributes:
+            raise HTTPException(status_code=400, detail=f"Audit '{audit_id}' groups by {existing.attributes}")
+
+    clock = StageClock("audit_decode", "audit_accumulate")
+    frames = prediction_frames(file.file, [y_true, y_pred, *attributes])
+    try:
+        accumulator, dropped = accumulate_predictions(frames, y_true, y_pred, attributes, positive, threshold, clock)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        frames.close()
+    clock.record()
+
+    try:
+        audit_id, total = audits.add(accumulator, audit_id)
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=409, detail=f"Audit '{audit_id}' was evicted or changed, start a new one")
+    return {"audit_id": audit_id, "rows_added": accumulator.rows, "rows_dropped": dropped, **total.report(min_support)}
+
+@app.get("/audits/{audit_id}")
+def audit_report(audit_id: str, min_support: int = GROUP_MIN_SUPPORT):
+    return {"audit_id": audit_id, **stored_audit(audit_id).report(min_support)}
+
+@app.get("/audits/{audit_id}/state")
+def audit_state(audit_id: str):
+    # Raw per-group counts, small enough to ship between workers
+    return {"audit_id": audit_id, **stored_audit(audit_id).state()}
+
+@app.post("/audits/merge")
+def merge_audits(req: MergeAuditsRequest):
+    # Combine stored audits and/or exported states into a new audit
+    try:
+        parts = [stored_audit(audit_id) for audit_id in req.audit_ids] + [ConfusionAccumulator.from_state(state) for state in req.states]
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid audit state: {e}")
+    if not parts:
+        raise HTTPException(status_code=400, detail="Nothing to merge")
+    merged = ConfusionAccumulator(parts[0].attributes)
+    try:
+        for part in parts:
+            merged.merge(part)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    audit_id, total = audits.add(merged)
+    return {"audit_id": audit_id, "merged": len(parts), **total.report(req.min_support)}
+
+@app.post("/jobs/mitigated")
+def submit_mitigated_job(req: JobRequest):
+    key = result_key("mitigated", req)
+    entry, tier = results.get(key)
+    if entry is not None:
+        return jobs.status(jobs.add_finished("mitigated", cached_payload(entry, tier)))
+
+    X, y, sex = load_training_data(req)
+    groups = intersection_groups(req, sex)
+    encoder = training_encoder(req)
+    job_id = jobs.submit(
+        "mitigated", run_mitigated, X, y, sex, req.seed, req.bootstrap, req.ci_level, groups, fast_options(req),
+        timeout=req.timeout_s, on_result=lambda result: finish_training("mitigated", key, req, encoder, finish_reduction(req, result)),
+    )
+    return jobs.status(job_id)
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return jobs.status(job_id)
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    jobs.status(job_id)  # 404 before we start streaming
+
+    async def events():
+        # One JSON line per tick until the job reaches a final state
+        while True:
+            job = jobs.status(job_id)
+            yield json.dumps(job) + "\n"
+            if job["status"] in FINAL_JOB_STATES:
+                return
+            await asyncio.sleep(JOB_POLL_INTERVAL_S)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    return jobs.cancel(job_id)
+
+# Everything above ran at import: record it for the import-time budget
+startup["module_import_s"] = round(time.perf_counter() - _module_started, 4)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import main
+
+client = TestClient(main.app)
+
+
+def csv_bytes(rows, seed):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "city": rng.choice(["north", "south", "east"], size=rows),
+        "income": rng.normal(50, 10, size=rows).round(2),
+        "sex": rng.choice(["Male", "Female"], size=rows),
+        "approved": rng.integers(0, 2, size=rows),
+    })
+    return frame.to_csv(index=False).encode()
+
+
+def upload(data, **params):
+    response = client.post("/upload", params=params, files={"file": ("data.csv", data, "text/csv")})
+    assert response.status_code == 200
+    info = response.json()
+    assert "error" not in info, info
+    return info
+
+
+def train(dataset_id):
+    return client.post("/train/biased", json={"dataset_id": dataset_id, "n_samples": 200})
+
+
+def test_append_keeps_shared_parent():
+    history = csv_bytes(400, seed=1)
+    first = upload(history)
+    # A second tenant uploads the same bytes and gets the same content-hashed id
+    second = upload(history)
+    assert second["deduplicated"] and second["dataset_id"] == first["dataset_id"]
+
+    appended = upload(csv_bytes(50, seed=2), append_to=first["dataset_id"])
+    assert appended["rows_kept"] == first["rows_kept"] + 50
+
+    assert train(second["dataset_id"]).status_code == 200
+    assert train(appended["dataset_id"]).status_code == 200
+
+
+def test_second_append_to_parent_leaves_first_intact():
+    # An appended dataset has spare room behind its columns
+    parent = upload(csv_bytes(30, seed=6), append_to=upload(csv_bytes(300, seed=3))["dataset_id"])
+    one = upload(csv_bytes(40, seed=4), append_to=parent["dataset_id"])
+    before = main.registry.get(one["dataset_id"])["dataset"].y.copy()
+    # Another tenant appends a different batch to the same parent
+    two = upload(csv_bytes(40, seed=5), append_to=parent["dataset_id"])
+    assert two["dataset_id"] != one["dataset_id"]
+    assert np.array_equal(main.registry.get(one["dataset_id"])["dataset"].y, before)
+    assert len(main.registry.get(parent["dataset_id"])["dataset"]) == parent["rows_kept"]
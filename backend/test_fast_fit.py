@@ -0,0 +1,36 @@
+import numpy as np
+
+import main
+
+
+def data(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    s = rng.integers(0, 2, size=n)
+    X = np.column_stack([rng.normal(size=n) + s, rng.normal(size=n)])
+    y = (X[:, 0] + rng.normal(scale=0.5, size=n) > 0.5).astype(int)
+    return X, y, s
+
+
+def fit(X, y, s, fast):
+    constraints = main.fairlearn_reductions.DemographicParity()
+    return main.fit_reduction(X, y, s, X, constraints, max_depth=3, seed=0, fast=fast)
+
+
+def test_warm_fit_predicts():
+    X, y, s = data()
+    cold, _ = fit(X, y, s, {"tol": main.FAST_TOL})
+    warm, y_pred = fit(X, y, s, {"tol": main.FAST_TOL, "warm": main.warm_state(cold)})
+    report = main.reduction_report(warm)
+    assert report["mode"] == "fast" and report["warm_start"]
+    assert y_pred.shape == y.shape and set(np.unique(y_pred)) <= {0, 1}
+    assert (y_pred == y).mean() > 0.6
+    # The mixture is a proper distribution over the fitted trees
+    assert np.isclose(warm.weights_.sum(), 1) and (warm.weights_ >= 0).all()
+
+
+def test_falls_back_to_stock_fit(monkeypatch):
+    monkeypatch.setattr(main, "_fast_supported", False)
+    X, y, s = data()
+    mitigator, y_pred = fit(X, y, s, {"tol": main.FAST_TOL})
+    assert main.reduction_report(mitigator)["mode"] == "cold"
+    assert y_pred.shape == y.shape
@@ -0,0 +1,32 @@
+import numpy as np
+
+import main
+
+
+def biased_population(n=20_000, seed=0):
+    # Group 0 is approved 70% of the time, group 1 30%; group 2 is a small minority
+    rng = np.random.default_rng(seed)
+    groups = rng.choice(3, size=n, p=[0.6, 0.38, 0.02])
+    rates = np.array([0.7, 0.3, 0.5])[groups]
+    y = (rng.random(n) < rates).astype(np.int8)
+    return y, groups.astype(np.int32)
+
+
+def test_prefix_base_rates_match_population():
+    y, groups = biased_population()
+    order, _ = main.build_sample_order(y, groups)
+    for n in (100, 500, 1000):
+        prefix = order[:n]
+        for group in (0, 1):
+            population = y[groups == group].mean()
+            sample = y[prefix][groups[prefix] == group].mean()
+            assert abs(sample - population) < 0.12, (n, group, sample, population)
+        # The bias stays visible, even in the smallest prefix
+        gap = y[prefix][groups[prefix] == 0].mean() - y[prefix][groups[prefix] == 1].mean()
+        assert gap > 0.25, (n, gap)
+
+
+def test_small_groups_are_represented():
+    y, groups = biased_population()
+    prefix = main.build_sample_order(y, groups)[0][:100]
+    assert np.count_nonzero(groups[prefix] == 2) >= min(main.SAMPLE_MIN_PER_GROUP, np.count_nonzero(groups == 2))
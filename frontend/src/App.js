@@ -8,6 +8,7 @@ function App() {
   const [biasedMetrics, setBiasedMetrics] = useState(null);
   const [mitigatedMetrics, setMitigatedMetrics] = useState(null);
   const [uploadStatus, setUploadStatus] = useState(null); // To track file upload
+  const [datasetId, setDatasetId] = useState(null); // Which upload the backend should train on
 
   // ✅ YOUR BACKEND URL
   const BACKEND_URL = "https://vigilant-memory-jjjw9q66grqwf56rj-8000.app.github.dev";
@@ -25,6 +26,7 @@ function App() {
       const res = await axios.post(`${BACKEND_URL}/upload`, formData, {
         headers: { 'Content-Type': 'multipart/form-data' }
       });
+      setDatasetId(res.data.dataset_id);
       setUploadStatus(`✅ Uploaded! (${res.data.rows} rows)`);
       // Reset graphs when new data comes in
       setBiasedMetrics(null);
@@ -40,7 +42,7 @@ function App() {
   const trainBiased = async () => {
     setLoading(true);
     try {
-      const res = await axios.post(`${BACKEND_URL}/train/biased`, { n_samples: 3000 });
+      const res = await axios.post(`${BACKEND_URL}/train/biased`, { n_samples: 3000, dataset_id: datasetId });
       setBiasedMetrics(res.data);
     } catch (err) {
       console.error(err);
@@ -53,7 +55,7 @@ function App() {
   const trainMitigated = async () => {
     setLoading(true);
     try {
-      const res = await axios.post(`${BACKEND_URL}/train/mitigated`, { n_samples: 3000 });
+      const res = await axios.post(`${BACKEND_URL}/train/mitigated`, { n_samples: 3000, dataset_id: datasetId });
       setMitigatedMetrics(res.data);
     } catch (err) {
       console.error(err);
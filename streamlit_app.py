@@ -3,7 +3,10 @@ import pandas as pd
 import numpy as np
 import requests
 import plotly.graph_objects as go
-from io import StringIO
+import time
+import gzip
+import hashlib
+from io import BytesIO
 
 st.set_page_config(page_title="Algorithmic Auditor", layout="wide")
 
@@ -21,6 +24,126 @@ if "mitigated_metrics" not in st.session_state:
     st.session_state.mitigated_metrics = None
 if "upload_status" not in st.session_state:
     st.session_state.upload_status = None
+if "dataset_id" not in st.session_state:
+    st.session_state.dataset_id = None
+if "sweep_results" not in st.session_state:
+    st.session_state.sweep_results = None
+if "audit_id" not in st.session_state:
+    st.session_state.audit_id = None
+
+def upload_summary(info):
+    # One-line status, including how much the feature encoding shrank the data
+    features = info.get("features") or {}
+    summary = f"✅ Uploaded! ({info.get('rows', '?')} rows"
+    if features:
+        summary += f", {features['features_before']} → {features['features_after']} features, ~{features['dense_mb']} MB dense → ~{features['sparse_mb']} MB sparse"
+    drift = info.get("drift") or {}
+    if info.get("rows_appended"):
+        summary += f", {info['rows_appended']} appended"
+    if drift.get("alerting_windows"):
+        summary += f" | ⚠️ fairness drift in {drift['alerting_windows']} window(s)"
+    return summary + ")"
+
+def format_ci(intervals, metric):
+    # "[lo, hi]" for the results table, or a dash when bootstrap was off
+    if not intervals:
+        return "—"
+    low, high = intervals[metric]
+    return f"[{low:.3f}, {high:.3f}]"
+
+def format_server_timing(header):
+    # "decode 12.3 ms · fit 40.1 ms" from the backend's Server-Timing header
+    if not header:
+        return ""
+    parts = []
+    for entry in header.split(","):
+        name, _, duration = entry.strip().partition(";dur=")
+        if duration:
+            parts.append(f"{name} {float(duration):.1f} ms")
+    return "⏱️ " + " · ".join(parts)
+
+# ============================================================================
+# BACKEND CLIENT
+# ============================================================================
+
+UPLOAD_CHUNK_BYTES = 8 * 2**20  # per resumable PUT
+UPLOAD_RETRIES = 3               # reconnects per upload before giving up
+
+@st.cache_resource
+def http_session():
+    # One pooled keep-alive session for every backend call, shared across reruns
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+http = http_session()
+
+# Parsing and hashing are cached per file, so reruns don't redo them.
+# The key is the file id (or the pasted text); the bytes themselves aren't hashed.
+@st.cache_data(max_entries=8, show_spinner=False)
+def parse_csv(key, _data):
+    return pd.read_csv(BytesIO(_data))
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def content_digest(key, _data):
+    return hashlib.sha256(_data).hexdigest()
+
+def upload_dataset(key, data, params):
+    # Hash first and skip the transfer if the backend already has this
+    # content. Otherwise gzip it and send it in resumable chunks.
+    # Returns (info, last response).
+    digest = content_digest(key, data)
+    if "append_to" not in params:
+        response = http.get(f"{BACKEND_URL}/datasets/by-hash/{digest}", params=params)
+        if response.status_code == 200:
+            return response.json(), response
+
+    body = gzip.compress(data, compresslevel=5)
+    response = http.post(f"{BACKEND_URL}/uploads", json={"size": len(body), "sha256": digest, **params})
+    response.raise_for_status()
+    if response.json()["upload_id"] is None:
+        return response.json()["dataset"], response
+    upload_url = f"{BACKEND_URL}/uploads/{response.json()['upload_id']}"
+
+    progress = st.progress(0.0, text=f"Sending {len(body) / 2**20:.1f} MB (gzip, {len(body) / max(len(data), 1):.0%} of original)")
+    offset, failures = 0, 0
+    while offset < len(body):
+        try:
+            response = http.put(upload_url, params={"offset": offset}, data=body[offset:offset + UPLOAD_CHUNK_BYTES], timeout=120)
+            if response.status_code == 409:
+                offset = response.json()["detail"]["offset"]  # the server is ahead or behind: resume there
+            else:
+                response.raise_for_status()
+                offset = response.json()["offset"]
+        except (requests.ConnectionError, requests.Timeout):
+            failures += 1
+            if failures > UPLOAD_RETRIES:
+                raise
+            time.sleep(failures)
+            offset = http.get(upload_url).json()["offset"]
+        progress.progress(offset / len(body))
+    progress.empty()
+
+    response = http.post(f"{upload_url}/complete")
+    if response.status_code != 200:
+        return {"error": response.text}, response
+    return response.json(), response
+
+def send_upload(key, data):
+    with st.spinner("Uploading..."):
+        try:
+            info, response = upload_dataset(key, data, upload_params)
+            if "error" not in info:
+                st.session_state.dataset_id = info.get("dataset_id")
+                st.session_state.upload_status = upload_summary(info)
+                st.success(st.session_state.upload_status)
+                st.caption(format_server_timing(response.headers.get("Server-Timing")))
+            else:
+                st.error(f"Upload failed: {info['error']}")
+        except Exception as e:
+            st.error(f"❌ Error: {str(e)}")
 
 # ============================================================================
 # TITLE & DESCRIPTION
@@ -40,12 +163,18 @@ with st.sidebar:
         BACKEND_URL = backend_url_input
     
     n_samples = st.slider("Number of Samples", min_value=100, max_value=10000, value=3000, step=100)
+    seed = st.number_input("Random Seed", min_value=0, value=42, step=1, help="Same seed + samples + data = same (cached) result")
+    bootstrap = st.number_input("Bootstrap Resamples (0 = off)", min_value=0, max_value=20000, value=0, step=500, help="Adds 95% confidence intervals to the metrics")
+    intersect_input = st.text_input("Intersectional Columns", value="", help="Comma-separated, e.g. race, gender, age. Audits every combination; numeric columns are bucketed")
+    min_support = st.number_input("Min Subgroup Size", min_value=1, value=30, step=5, help="Subgroups with fewer test rows are left out of the gaps")
+
+sensitive_columns = [col.strip() for col in intersect_input.split(",") if col.strip()] or None
 
 # ============================================================================
 # MAIN LAYOUT - TABS
 # ============================================================================
 
-tab1, tab2, tab3 = st.tabs(["📊 Data Upload", "🤖 Model Training", "📈 Results"])
+tab1, tab2, tab3, tab4 = st.tabs(["📊 Data Upload", "🤖 Model Training", "📈 Results", "🧭 Trade-off Sweep"])
 
 # ============================================================================
 # TAB 1: DATA UPLOAD
@@ -54,6 +183,16 @@ tab1, tab2, tab3 = st.tabs(["📊 Data Upload", "🤖 Model Training", "📈 Res
 with tab1:
     st.header("Upload Your Data")
     
+    with st.expander("⚙️ Encoding Options"):
+        encoding = st.selectbox("Categorical Encoding", ["onehot", "hash"], help="One-hot keeps the top categories per column; hashing folds all categories into a fixed number of buckets")
+        max_categories = st.number_input("Max Categories per Column", min_value=2, max_value=10000, value=100, step=10)
+        hash_buckets = st.number_input("Hash Buckets", min_value=16, max_value=65536, value=1024, step=64)
+        append_mode = st.checkbox("Append to the current dataset", value=False, disabled=not st.session_state.dataset_id, help="Adds the rows to the uploaded dataset with its existing encoders, and tracks fairness drift over time")
+        time_column = st.text_input("Time Column (append mode)", value="", help="Timestamps for drift windows; arrival time if empty")
+    upload_params = {"encoding": encoding, "max_categories": int(max_categories), "hash_buckets": int(hash_buckets)}
+    if append_mode:
+        upload_params = {"append_to": st.session_state.dataset_id, **({"time_column": time_column} if time_column else {})}
+    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -61,51 +200,28 @@ with tab1:
         uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
         
         if uploaded_file is not None:
-            # Read and display the file
-            df = pd.read_csv(uploaded_file)
+            # Read and display the file (parsed once per file, not per rerun)
+            file_key = getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+            df = parse_csv(file_key, uploaded_file.getvalue())
             st.success(f"✅ File loaded! Shape: {df.shape}")
             st.dataframe(df.head(10), use_container_width=True)
             
             # Upload to backend
             if st.button("Upload to Backend", key="upload_btn"):
-                with st.spinner("Uploading..."):
-                    try:
-                        files = {"file": uploaded_file.getvalue()}
-                        response = requests.post(
-                            f"{BACKEND_URL}/upload",
-                            files={"file": ("data.csv", uploaded_file.getvalue())}
-                        )
-                        if response.status_code == 200:
-                            st.session_state.upload_status = f"✅ Uploaded! ({response.json().get('rows', '?')} rows)"
-                            st.success(st.session_state.upload_status)
-                        else:
-                            st.error(f"Upload failed: {response.text}")
-                    except Exception as e:
-                        st.error(f"❌ Error: {str(e)}")
+                send_upload(file_key, uploaded_file.getvalue())
     
     with col2:
         st.subheader("Option 2: Paste CSV Data")
         csv_text = st.text_area("Paste CSV data here", height=150)
         if csv_text:
             try:
-                df_pasted = pd.read_csv(StringIO(csv_text))
+                pasted = csv_text.encode()
+                df_pasted = parse_csv(csv_text, pasted)
                 st.success(f"✅ Parsed! Shape: {df_pasted.shape}")
                 st.dataframe(df_pasted.head(), use_container_width=True)
                 
                 if st.button("Upload Pasted Data", key="upload_paste_btn"):
-                    with st.spinner("Uploading..."):
-                        try:
-                            response = requests.post(
-                                f"{BACKEND_URL}/upload",
-                                files={"file": ("data.csv", csv_text)}
-                            )
-                            if response.status_code == 200:
-                                st.session_state.upload_status = f"✅ Uploaded! ({response.json().get('rows', '?')} rows)"
-                                st.success(st.session_state.upload_status)
-                            else:
-                                st.error(f"Upload failed: {response.text}")
-                        except Exception as e:
-                            st.error(f"❌ Error: {str(e)}")
+                    send_upload(csv_text, pasted)
             except Exception as e:
                 st.error(f"Invalid CSV format: {str(e)}")
     
@@ -113,19 +229,55 @@ with tab1:
     if st.session_state.upload_status:
         st.info(st.session_state.upload_status)
     
+    # Audit predictions made by an external model
+    st.markdown("---")
+    with st.expander("🧾 Audit External Predictions"):
+        st.markdown("Upload a scoring log with true labels, predictions and sensitive columns. Large files are processed chunk by chunk.")
+        log_file = st.file_uploader("Predictions log (CSV, .gz or .zst)", key="audit_log")
+        log_cols = st.columns(3)
+        log_sensitive = log_cols[0].text_input("Sensitive Columns", value="sex", help="Comma-separated; several columns are audited as intersections")
+        log_true = log_cols[1].text_input("Label Column", value="y_true")
+        log_pred = log_cols[2].text_input("Prediction Column", value="y_pred")
+        add_to = st.checkbox("Add to the previous audit", value=False, disabled=not st.session_state.audit_id)
+        if log_file is not None and st.button("Audit Predictions", key="audit_log_btn"):
+            with st.spinner("Auditing..."):
+                try:
+                    params = {"sensitive": log_sensitive, "y_true": log_true, "y_pred": log_pred, "min_support": int(min_support)}
+                    if add_to:
+                        params["audit_id"] = st.session_state.audit_id
+                    response = http.post(f"{BACKEND_URL}/audits/predictions", files={"file": (log_file.name, log_file.getvalue())}, params=params)
+                    if response.status_code == 200:
+                        report = response.json()
+                        st.session_state.audit_id = report["audit_id"]
+                        st.success(f"✅ Audit {report['audit_id']}: {report['rows']:,} rows | Accuracy {report['accuracy']:.3f} | Bias gap {report['demographic_parity_difference']:.3f}")
+                        st.caption(format_server_timing(response.headers.get("Server-Timing")))
+                        st.dataframe(pd.DataFrame(report["groups"]).T, use_container_width=True)
+                    else:
+                        st.error(f"Audit failed: {response.text}")
+                except Exception as e:
+                    st.error(f"❌ Error: {str(e)}")
+
     # Example data generator
     st.markdown("---")
     st.subheader("💡 Generate Sample Data")
+    gen_cols = st.columns(3)
+    gen_rows = gen_cols[0].number_input("Rows", min_value=100, max_value=1_000_000, value=500, step=100)
+    gen_bias = gen_cols[1].slider("Injected Bias", min_value=0.0, max_value=0.5, value=0.2, step=0.05, help="Approval-rate gap between Male and Female applicants")
+    gen_seed = gen_cols[2].number_input("Generator Seed", min_value=0, value=42, step=1)
     if st.button("Generate Synthetic Dataset"):
-        # Create a simple synthetic dataset
-        np.random.seed(42)
-        n = 500
+        # Seeded local generator (the same seed gives the same file); approval
+        # rates differ by exactly gen_bias in expectation, so the audit's
+        # reported gap can be checked against it
+        rng = np.random.default_rng(int(gen_seed))
+        n = int(gen_rows)
+        gender = rng.choice(['Male', 'Female'], n)
+        approval_rate = np.where(gender == 'Male', 0.5 + gen_bias / 2, 0.5 - gen_bias / 2)
         df_synthetic = pd.DataFrame({
-            'age': np.random.randint(20, 70, n),
-            'income': np.random.choice(['low', 'high'], n, p=[0.6, 0.4]),
-            'gender': np.random.choice(['Male', 'Female'], n),
-            'education': np.random.choice(['HS', 'Bachelor', 'Master'], n),
-            'approved': np.random.choice([0, 1], n)
+            'age': rng.integers(20, 70, n),
+            'income': rng.choice(['low', 'high'], n, p=[0.6, 0.4]),
+            'gender': gender,
+            'education': rng.choice(['HS', 'Bachelor', 'Master'], n),
+            'approved': (rng.random(n) < approval_rate).astype(int)
         })
         
         csv_content = df_synthetic.to_csv(index=False)
@@ -156,13 +308,14 @@ with tab2:
         if st.button("🚀 Train Biased Model", key="train_biased_btn"):
             with st.spinner("Training biased model..."):
                 try:
-                    response = requests.post(
+                    response = http.post(
                         f"{BACKEND_URL}/train/biased",
-                        json={"n_samples": n_samples}
+                        json={"n_samples": n_samples, "dataset_id": st.session_state.dataset_id, "seed": int(seed), "bootstrap": int(bootstrap), "sensitive_columns": sensitive_columns, "min_support": int(min_support)}
                     )
                     if response.status_code == 200:
                         st.session_state.biased_metrics = response.json()
-                        st.success("✅ Biased model trained!")
+                        st.success(f"✅ Biased model trained! (cache: {response.json().get('cache', 'n/a')})")
+                        st.caption(format_server_timing(response.headers.get("Server-Timing")))
                     else:
                         st.error(f"Training failed: {response.text}")
                 except Exception as e:
@@ -172,25 +325,70 @@ with tab2:
     with col2:
         st.subheader("2️⃣ Train Mitigated Model")
         st.markdown("Trains a Decision Tree with fairness constraints (Demographic Parity)")
+        fast_mode = st.checkbox("Fast mitigation", value=False, help="Warm-starts from the last mitigated run on this dataset and stops once the fairness constraint and objective settle")
+        coarse_first = st.checkbox("Solve on a 20% sample first", value=False, disabled=not fast_mode)
+        fast_options = {"fast": fast_mode, "coarse_fraction": 0.2 if fast_mode and coarse_first else None}
         
         if st.button("🚀 Train Mitigated Model", key="train_mitigated_btn"):
             with st.spinner("Training mitigated model..."):
                 try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/train/mitigated",
-                        json={"n_samples": n_samples}
+                    # Submit as a background job and poll, so long fits don't time out
+                    response = http.post(
+                        f"{BACKEND_URL}/jobs/mitigated",
+                        json={"n_samples": n_samples, "dataset_id": st.session_state.dataset_id, "seed": int(seed), "bootstrap": int(bootstrap), "sensitive_columns": sensitive_columns, "min_support": int(min_support), **fast_options}
                     )
                     if response.status_code == 200:
-                        st.session_state.mitigated_metrics = response.json()
-                        st.success("✅ Mitigated model trained!")
+                        job_id = response.json()["job_id"]
+                        progress_box = st.empty()
+                        while True:
+                            job = http.get(f"{BACKEND_URL}/jobs/{job_id}").json()
+                            if job["status"] in ("done", "failed", "cancelled", "timeout"):
+                                break
+                            progress_box.info(f"⏳ {job['status'].title()}… iteration {job['iteration'] or 0} | {job['elapsed_s'] or 0:.1f}s")
+                            time.sleep(0.5)
+                        progress_box.empty()
+
+                        if job["status"] == "done":
+                            st.session_state.mitigated_metrics = job["result"]
+                            st.success(f"✅ Mitigated model trained! ({job['result'].get('iterations', '?')} iterations, {job['elapsed_s']:.1f}s, cache: {job['result'].get('cache', 'n/a')})")
+                            reduction = job["result"].get("reduction") or {}
+                            if reduction.get("time_saved_s") is not None and reduction.get("mode") == "fast":
+                                st.caption(f"Fast mode: {reduction['iterations']} iterations, ~{reduction['time_saved_s']:.1f}s saved vs a cold run (warm start: {reduction['warm_start']})")
+                        else:
+                            st.error(f"Training {job['status']}: {job.get('error', '')}")
                     else:
                         st.error(f"Training failed: {response.text}")
                 except Exception as e:
                     st.error(f"❌ Error: {str(e)}")
     
+    # Full audit: both models on the same split, in one request
+    st.markdown("---")
+    st.subheader("⚖️ Run Full Audit")
+    st.markdown("Trains both models on the **same** sample and test split, so the comparison is apples to apples")
+    
+    if st.button("🚀 Run Full Audit", key="audit_btn"):
+        with st.spinner("Training baseline and mitigated models..."):
+            try:
+                response = http.post(
+                    f"{BACKEND_URL}/audit",
+                    json={"n_samples": n_samples, "dataset_id": st.session_state.dataset_id, "seed": int(seed), "bootstrap": int(bootstrap), "sensitive_columns": sensitive_columns, "min_support": int(min_support), **fast_options}
+                )
+                if response.status_code == 200:
+                    audit = response.json()
+                    st.session_state.biased_metrics = audit["baseline"]
+                    st.session_state.mitigated_metrics = audit["mitigated"]
+                    st.success(f"✅ Audit complete in {audit['timings']['total_s']:.2f}s (cache: {audit.get('cache', 'n/a')})")
+                    st.caption(format_server_timing(response.headers.get("Server-Timing")))
+                    st.json(audit["timings"], expanded=False)
+                else:
+                    st.error(f"Audit failed: {response.text}")
+            except Exception as e:
+                st.error(f"❌ Error: {str(e)}")
+    
     # Training info
     st.markdown("---")
-    st.info(f"**Current Configuration:** {n_samples} samples | Backend: {BACKEND_URL}")
+    dataset_label = st.session_state.dataset_id or "synthetic"
+    st.info(f"**Current Configuration:** {n_samples} samples | Seed: {seed} | Dataset: {dataset_label} | Backend: {BACKEND_URL}")
 
 # ============================================================================
 # TAB 3: RESULTS COMPARISON
@@ -211,8 +409,11 @@ with tab3:
                 "Model": "Biased (Baseline)",
                 "Accuracy": st.session_state.biased_metrics.get("accuracy", 0),
                 "Bias Gap": st.session_state.biased_metrics.get("bias_gap", 0),
-                "Male Selection Rate": st.session_state.biased_metrics.get("male_rate", 0),
-                "Female Selection Rate": st.session_state.biased_metrics.get("female_rate", 0)
+                "Equalized Odds Diff": st.session_state.biased_metrics.get("equalized_odds_difference"),
+                "Disparate Impact Ratio": st.session_state.biased_metrics.get("disparate_impact_ratio"),
+                "Bias Gap CI": format_ci(st.session_state.biased_metrics.get("confidence_intervals"), "bias_gap"),
+                "Accuracy CI": format_ci(st.session_state.biased_metrics.get("confidence_intervals"), "accuracy"),
+                "Groups": st.session_state.biased_metrics.get("groups", {})
             })
         
         if st.session_state.mitigated_metrics:
@@ -220,15 +421,33 @@ with tab3:
                 "Model": "Mitigated (Fair)",
                 "Accuracy": st.session_state.mitigated_metrics.get("accuracy", 0),
                 "Bias Gap": st.session_state.mitigated_metrics.get("bias_gap", 0),
-                "Male Selection Rate": st.session_state.mitigated_metrics.get("male_rate", 0),
-                "Female Selection Rate": st.session_state.mitigated_metrics.get("female_rate", 0)
+                "Equalized Odds Diff": st.session_state.mitigated_metrics.get("equalized_odds_difference"),
+                "Disparate Impact Ratio": st.session_state.mitigated_metrics.get("disparate_impact_ratio"),
+                "Bias Gap CI": format_ci(st.session_state.mitigated_metrics.get("confidence_intervals"), "bias_gap"),
+                "Accuracy CI": format_ci(st.session_state.mitigated_metrics.get("confidence_intervals"), "accuracy"),
+                "Groups": st.session_state.mitigated_metrics.get("groups", {})
             })
         
         df_comparison = pd.DataFrame(metrics_data)
         
         # Display metrics table
         st.subheader("Detailed Metrics")
-        st.dataframe(df_comparison, use_container_width=True)
+        st.dataframe(df_comparison.drop(columns=["Groups"]), use_container_width=True)
+
+        # Intersectional subgroups, when the audit asked for them
+        for label, result in [("Biased (Baseline)", st.session_state.biased_metrics), ("Mitigated (Fair)", st.session_state.mitigated_metrics)]:
+            intersectional = (result or {}).get("intersectional")
+            if not intersectional:
+                continue
+            st.subheader(f"Intersectional Subgroups: {label}")
+            st.caption(
+                f"{' × '.join(intersectional['attributes'])} | {intersectional['groups_reported']} of {intersectional['groups_observed']} subgroups "
+                f"with ≥ {intersectional['min_support']} test rows | Bias gap {intersectional['demographic_parity_difference']:.3f}"
+            )
+            worst = {name: pick["group"] for name, pick in intersectional["worst_groups"].items() if pick}
+            if worst:
+                st.json(worst, expanded=False)
+            st.dataframe(pd.DataFrame(intersectional["groups"]).T.sort_values("selection_rate"), use_container_width=True)
         
         # Create visualizations
         col1, col2 = st.columns(2)
@@ -273,45 +492,25 @@ with tab3:
             )
             st.plotly_chart(fig_bias, use_container_width=True)
         
-        # Selection rates by gender
-        st.subheader("Selection Rates by Gender")
-        col3, col4 = st.columns(2)
-        
-        with col3:
-            fig_male = go.Figure()
-            for idx, row in df_comparison.iterrows():
-                fig_male.add_trace(go.Bar(
-                    x=[row["Model"]],
-                    y=[row["Male Selection Rate"]],
-                    text=f'{row["Male Selection Rate"]:.3f}',
-                    textposition='auto',
-                ))
-            fig_male.update_layout(
-                title="Male Selection Rate",
-                yaxis_title="Selection Rate",
-                yaxis=dict(range=[0, 1]),
-                showlegend=False,
-                height=350
-            )
-            st.plotly_chart(fig_male, use_container_width=True)
-        
-        with col4:
-            fig_female = go.Figure()
-            for idx, row in df_comparison.iterrows():
-                fig_female.add_trace(go.Bar(
-                    x=[row["Model"]],
-                    y=[row["Female Selection Rate"]],
-                    text=f'{row["Female Selection Rate"]:.3f}',
-                    textposition='auto',
-                ))
-            fig_female.update_layout(
-                title="Female Selection Rate",
-                yaxis_title="Selection Rate",
-                yaxis=dict(range=[0, 1]),
-                showlegend=False,
-                height=350
-            )
-            st.plotly_chart(fig_female, use_container_width=True)
+        # Selection rates for every group the backend reported
+        st.subheader("Selection Rates by Group")
+        fig_groups = go.Figure()
+        for idx, row in df_comparison.iterrows():
+            groups = row["Groups"] or {}
+            fig_groups.add_trace(go.Bar(
+                x=list(groups),
+                y=[g["selection_rate"] for g in groups.values()],
+                name=row["Model"],
+                text=[f'{g["selection_rate"]:.3f}' for g in groups.values()],
+                textposition='auto',
+            ))
+        fig_groups.update_layout(
+            barmode="group",
+            yaxis_title="Selection Rate",
+            yaxis=dict(range=[0, 1]),
+            height=400
+        )
+        st.plotly_chart(fig_groups, use_container_width=True)
         
         # Summary insights
         st.markdown("---")
@@ -334,6 +533,67 @@ with tab3:
                 status = "✅ Improved" if fairness_improved else "⚠️ Degraded"
                 st.metric("Fairness Status", status)
 
+# ============================================================================
+# TAB 4: ACCURACY / FAIRNESS TRADE-OFF SWEEP
+# ============================================================================
+
+with tab4:
+    st.header("🧭 Accuracy vs. Fairness Sweep")
+    st.markdown("Fits one mitigated model per combination below, in parallel, and highlights the Pareto-optimal ones")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sweep_constraints = st.multiselect(
+            "Constraints",
+            ["DemographicParity", "EqualizedOdds", "TruePositiveRateParity"],
+            default=["DemographicParity", "EqualizedOdds"]
+        )
+    with col2:
+        sweep_bounds = st.multiselect("Difference Bounds", [0.005, 0.01, 0.02, 0.05, 0.1, 0.2], default=[0.01, 0.05, 0.1])
+    with col3:
+        sweep_depths = st.multiselect("Tree Depths", [2, 3, 4, 5, 6, 8, 10], default=[3, 5])
+    
+    if st.button("🚀 Run Sweep", key="sweep_btn"):
+        with st.spinner(f"Fitting {len(sweep_constraints) * len(sweep_bounds) * len(sweep_depths)} models..."):
+            try:
+                response = http.post(
+                    f"{BACKEND_URL}/sweep",
+                    json={
+                        "n_samples": n_samples, "dataset_id": st.session_state.dataset_id, "seed": int(seed),
+                        "constraints": sweep_constraints, "difference_bounds": sweep_bounds, "max_depths": sweep_depths,
+                    }
+                )
+                if response.status_code == 200:
+                    st.session_state.sweep_results = response.json()
+                    st.success(f"✅ Sweep finished in {st.session_state.sweep_results['elapsed_s']:.1f}s")
+                else:
+                    st.error(f"Sweep failed: {response.text}")
+            except Exception as e:
+                st.error(f"❌ Error: {str(e)}")
+    
+    if st.session_state.sweep_results:
+        points = pd.DataFrame([p for p in st.session_state.sweep_results["points"] if "accuracy" in p])
+        pareto = pd.DataFrame(st.session_state.sweep_results["pareto"])
+        
+        fig_sweep = go.Figure()
+        for constraint, group in points.groupby("constraint"):
+            fig_sweep.add_trace(go.Scatter(
+                x=group["bias_gap"], y=group["accuracy"], mode="markers", name=constraint,
+                text=[f"bound={b}, depth={d}" for b, d in zip(group["difference_bound"], group["max_depth"])],
+            ))
+        fig_sweep.add_trace(go.Scatter(
+            x=pareto["bias_gap"], y=pareto["accuracy"], mode="lines+markers", name="Pareto front",
+            line=dict(dash="dash", color="black"),
+        ))
+        fig_sweep.update_layout(
+            xaxis_title="Bias Gap (|DPD|, lower is better)",
+            yaxis_title="Accuracy",
+            height=450
+        )
+        st.plotly_chart(fig_sweep, use_container_width=True)
+        st.subheader("Pareto-Optimal Models")
+        st.dataframe(pareto, use_container_width=True)
+
 # ============================================================================
 # FOOTER
 # ============================================================================
@@ -349,4 +609,6 @@ This tool helps detect and mitigate bias in machine learning models by comparing
 - **Accuracy**: Predictive performance
 - **Demographic Parity Difference (DPD)**: Measures fairness gap between groups
 - **Selection Rate**: Proportion of positive predictions per demographic group
+- **Equalized Odds Difference**: Largest gap in true/false positive rates between groups
+- **Disparate Impact Ratio**: Lowest group selection rate divided by the highest
 """)